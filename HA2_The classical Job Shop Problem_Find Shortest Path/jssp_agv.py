@@ -0,0 +1,392 @@
+import heapq
+import math
+import time
+
+import gurobipy as gp
+import numpy as np
+from gurobipy import GRB
+
+from jssp_bounds import lower_bounds
+from jssp_heuristics import dispatch_best
+from jssp_milp import build_job_scheduling_model, set_initial_schedule
+from jssp_schedule import Schedule, machine_sequences, semi_active_schedule
+from jssp_travel import travel_lags, travel_time_matrix
+
+
+class TransportPlan:
+    """Which vehicle carries every job between its operations, and when.
+
+    vehicle[j, k] and departure[j, k] belong to the move of job j from the
+    machine of operation k to that of operation k + 1; it arrives at
+    departure + travel[machines[j][k], machines[j][k + 1]]. Vehicles wait
+    wherever they unloaded last and may start anywhere. iterations and cuts
+    count the Benders iterations and cuts of the solve that made the plan.
+    """
+
+    __slots__ = ('vehicle', 'departure', 'machines', 'travel', 'vehicles', 'iterations', 'cuts')
+
+    def __init__(self, vehicle, departure, machines, travel, vehicles):
+        self.vehicle = np.asarray(vehicle, dtype=np.int64)
+        self.departure = np.asarray(departure, dtype=np.int64)
+        self.machines = np.asarray(machines, dtype=np.int64)
+        self.travel = np.asarray(travel, dtype=np.int64)
+        self.vehicles = vehicles
+        self.iterations = 0
+        self.cuts = 0
+
+    @property
+    def arrival(self):
+        return self.departure + self.travel[self.machines[:, :-1], self.machines[:, 1:]]
+
+    def violations(self, start, times):
+        """Messages for every broken transport constraint of the schedule start; empty if it fits the plan."""
+        messages = []
+        start, end = np.asarray(start), np.asarray(start) + np.asarray(times)
+        for j, k in zip(*np.nonzero(self.departure < end[:, :-1])):
+            messages.append('job {} leaves machine {} at {} before {}'.format(
+                j, self.machines[j, k], self.departure[j, k], end[j, k]))
+        for j, k in zip(*np.nonzero(start[:, 1:] < self.arrival)):
+            messages.append('job {} operation {} starts at {} before it arrives at {}'.format(
+                j, k + 1, start[j, k + 1], self.arrival[j, k]))
+        # Every vehicle drives its moves one after the other, with the empty trip in between
+        for v in range(self.vehicles):
+            moves = sorted(zip(*np.nonzero(self.vehicle == v)), key=lambda move: self.departure[move])
+            for (j, k), (l, h) in zip(moves, moves[1:]):
+                ready = self.arrival[j, k] + self.travel[self.machines[j, k + 1], self.machines[l, h]]
+                if self.departure[l, h] < ready:
+                    messages.append('vehicle {} leaves for job {} at {} before {}'.format(
+                        v, l, self.departure[l, h], ready))
+        return messages
+
+
+def _travel(travel_times):
+    # Start times are integral, so travel times are rounded up like the lags of the extended MILP
+    return np.ceil(np.asarray(travel_times, dtype=float) - 1e-9).astype(np.int64)
+
+
+def dispatch_vehicles(times, machines, sequences, travel, vehicles):
+    """Schedule the given machine sequences with a fleet of vehicles, greedily.
+
+    Whenever a job finishes an operation its move joins a queue; moves are
+    served in order of those release times, each by the vehicle that can be
+    at the pickup first. Returns (start, vehicle, departure), or None when
+    the sequences contain a cycle.
+    """
+    times = np.asarray(times, dtype=np.int64)
+    machines = np.asarray(machines, dtype=np.int64)
+    n, m = times.shape
+    start = np.full((n, m), -1, dtype=np.int64)
+    vehicle = np.zeros((n, max(m - 1, 0)), dtype=np.int64)
+    departure = np.zeros((n, max(m - 1, 0)), dtype=np.int64)
+    position = [0] * m  # next place in every machine sequence
+    machine_free = [0] * m
+    next_op = [0] * n
+    ready = [0] * n  # when the job is at its next machine; None while it waits for a vehicle
+    free = [0] * vehicles
+    location = [None] * vehicles  # None: not used yet, can start anywhere
+    moves = []
+    done = 0
+    while done < n * m:
+        progress = True
+        while progress:
+            progress = False
+            for i in range(m):
+                if position[i] == n:
+                    continue
+                j = sequences[i][position[i]]
+                k = next_op[j]
+                if k == m or machines[j, k] != i or ready[j] is None:
+                    continue
+                start[j, k] = max(ready[j], machine_free[i])
+                machine_free[i] = start[j, k] + times[j, k]
+                position[i] += 1
+                next_op[j] += 1
+                done += 1
+                progress = True
+                if k + 1 < m:
+                    ready[j] = None
+                    heapq.heappush(moves, (int(machine_free[i]), j, k))
+        if not moves:
+            if done < n * m:
+                return None
+            break
+        release, j, k = heapq.heappop(moves)
+        a, b = machines[j, k], machines[j, k + 1]
+        at_pickup = [max(release, free[v] + (travel[location[v], a] if location[v] is not None else 0))
+                     for v in range(vehicles)]
+        v = min(range(vehicles), key=at_pickup.__getitem__)
+        vehicle[j, k], departure[j, k] = v, at_pickup[v]
+        free[v], location[v] = at_pickup[v] + travel[a, b], b
+        ready[j] = free[v]
+    return start, vehicle, departure
+
+
+def _makespan(plan, times):
+    return int((plan[0] + np.asarray(times)).max())
+
+
+def _first_use_labels(vehicle):
+    # Rename the vehicles in the order they first appear, the symmetry breaking of the subproblem
+    labels = {}
+    for v in vehicle.ravel():
+        labels.setdefault(int(v), len(labels))
+    return np.vectorize(labels.get, otypes=[np.int64])(vehicle) if vehicle.size else vehicle
+
+
+def transport_windows(times, machines, sequences, travel, horizon):
+    """Earliest and latest start of every operation for fixed machine sequences.
+
+    Heads and tails are the longest paths through the job routes (with the
+    loaded trips as lags) and the machine sequences, as in the extended
+    MILP; the vehicles only make them longer. Returns (est, lst), or None
+    when the sequences contain a cycle.
+    """
+    times = np.asarray(times, dtype=np.int64)
+    machines = np.asarray(machines, dtype=np.int64)
+    loaded = travel[machines[:, :-1], machines[:, 1:]]
+    est = semi_active_schedule(times, machines, sequences, loaded)
+    # The tails are the heads of the instance run backwards
+    backwards = semi_active_schedule(times[:, ::-1], machines[:, ::-1], [sequence[::-1] for sequence in sequences],
+                                     loaded[:, ::-1])
+    if est is None or backwards is None:
+        return None
+    return est, horizon - backwards[:, ::-1] - times
+
+
+def solve_transport_subproblem(times, machines, sequences, travel, vehicles, horizon, time_limit=60, initial=None):
+    """Best vehicle assignment and sequencing for fixed machine sequences, finishing by horizon.
+
+    A MILP with start times and departures inside their windows (see
+    transport_windows), a vehicle per move and, for moves of different jobs,
+    binaries f[t, u] = move t comes before move u on the same vehicle
+    (indicator constraints keep the loaded and the empty trip between them).
+    An order the windows leave no room for gets no binary; when neither
+    fits, the two moves need different vehicles. Moves of one job need
+    nothing: the job itself keeps them further apart than the empty trip.
+    Moves may only use vehicles up to their own index, which removes the
+    symmetry of identical vehicles. initial = (start, vehicle, departure)
+    becomes the MIP start if it finishes by horizon.
+
+    Returns (plan, bound): plan = (start, vehicle, departure) or None if
+    none was found, bound a lower bound on the makespan of these sequences
+    (horizon + 1 when no plan finishes by horizon).
+    """
+    times = np.asarray(times, dtype=np.int64)
+    machines = np.asarray(machines, dtype=np.int64)
+    n, m = times.shape
+    windows = transport_windows(times, machines, sequences, travel, horizon)
+    if windows is None:
+        raise ValueError("The machine sequences contain a cycle")
+    est, lst = windows
+    if (est > lst).any():
+        return None, horizon + 1
+    loaded = travel[machines[:, :-1], machines[:, 1:]]
+    leave_early, leave_late = est[:, :-1] + times[:, :-1], lst[:, 1:] - loaded
+    moves = [(j, k) for j in range(n) for k in range(m - 1)]
+
+    model = gp.Model('JSSP transport')
+    model.Params.TimeLimit = max(time_limit, 0.01)
+    c = model.addVar(vtype=GRB.INTEGER, ub=horizon)
+    s = {(j, k): model.addVar(vtype=GRB.INTEGER, lb=est[j, k], ub=lst[j, k]) for j in range(n) for k in range(m)}
+    d = {(j, k): model.addVar(vtype=GRB.INTEGER, lb=leave_early[j, k], ub=leave_late[j, k])
+         for j in range(n) for k in range(m - 1)}
+    model.setObjective(c, GRB.MINIMIZE)
+    for j in range(n):
+        model.addConstr(c >= s[j, m - 1] + int(times[j, m - 1]))
+        for k in range(m - 1):
+            model.addConstr(d[j, k] >= s[j, k] + int(times[j, k]))
+            model.addConstr(s[j, k + 1] >= d[j, k] + int(loaded[j, k]))
+    op_of = np.empty((n, m), dtype=np.int64)
+    op_of[np.arange(n)[:, None], machines] = np.arange(m)
+    for i, sequence in enumerate(sequences):
+        for a, b in zip(sequence, sequence[1:]):
+            model.addConstr(s[b, op_of[b, i]] >= s[a, op_of[a, i]] + int(times[a, op_of[a, i]]))
+
+    z = {(t, v): model.addVar(vtype=GRB.BINARY) for t in range(len(moves)) for v in range(min(t + 1, vehicles))}
+    for t in range(len(moves)):
+        model.addConstr(gp.quicksum(z[t, v] for v in range(min(t + 1, vehicles))) == 1)
+    f = {}
+    for t, (j, k) in enumerate(moves):
+        for u, (l, h) in enumerate(moves[t + 1:], t + 1):
+            if l == j:
+                continue
+            # Time from leaving with one move until the vehicle can leave with the other
+            gap_tu = int(loaded[j, k] + travel[machines[j, k + 1], machines[l, h]])
+            gap_ut = int(loaded[l, h] + travel[machines[l, h + 1], machines[j, k]])
+            orders = []
+            if leave_early[j, k] + gap_tu <= leave_late[l, h]:
+                f[t, u] = model.addVar(vtype=GRB.BINARY)
+                model.addGenConstrIndicator(f[t, u], True, d[l, h] >= d[j, k] + gap_tu)
+                orders.append(f[t, u])
+            if leave_early[l, h] + gap_ut <= leave_late[j, k]:
+                f[u, t] = model.addVar(vtype=GRB.BINARY)
+                model.addGenConstrIndicator(f[u, t], True, d[j, k] >= d[l, h] + gap_ut)
+                orders.append(f[u, t])
+            for v in range(min(t + 1, vehicles)):
+                model.addConstr(z[t, v] + z[u, v] <= 1 + gp.quicksum(orders))
+
+    if initial is not None and _makespan(initial, times) <= horizon:
+        start, vehicle, departure = initial
+        vehicle = _first_use_labels(vehicle)
+        c.Start = float(_makespan(initial, times))
+        for (j, k), var in s.items():
+            var.Start = float(start[j, k])
+        for t, (j, k) in enumerate(moves):
+            d[j, k].Start = float(departure[j, k])
+            for v in range(min(t + 1, vehicles)):
+                z[t, v].Start = 1.0 if vehicle[j, k] == v else 0.0
+        for (t, u), var in f.items():
+            (j, k), (l, h) = moves[t], moves[u]
+            var.Start = 1.0 if vehicle[j, k] == vehicle[l, h] and departure[j, k] < departure[l, h] else 0.0
+
+    model.optimize()
+    if model.status in (GRB.INFEASIBLE, GRB.INF_OR_UNBD):
+        return None, horizon + 1
+    bound = math.ceil(model.ObjBound - 1e-6)
+    if model.SolCount == 0:
+        return None, bound
+    start = np.rint([[s[j, k].X for k in range(m)] for j in range(n)]).astype(np.int64)
+    departure = np.rint([[d[j, k].X for k in range(m - 1)] for j in range(n)]).astype(np.int64)
+    vehicle = np.zeros((n, max(m - 1, 0)), dtype=np.int64)
+    for (t, v), var in z.items():
+        if var.X > 0.5:
+            vehicle[moves[t]] = v
+    return (start, vehicle, departure), bound
+
+
+def _no_good(master, sequences):
+    # Number of the master's free order binaries that differ from the given sequences
+    rank = [{job: r for r, job in enumerate(sequence)} for sequence in sequences]
+    flipped = gp.LinExpr()
+    for (j, k, i), var in master._y.items():
+        flipped += (1 - var) if rank[i][j] < rank[i][k] else var
+    return flipped
+
+
+def solve_job_scheduling_agv(n, m, times, machines, vehicles=2, travel_times=None, time_limit=20 * 60,
+                             callback=None, on_bound=None, initial_start=None, subproblem_time_limit=60):
+    """Minimize the makespan when a fleet of vehicles carries the jobs between machines.
+
+    Logic-based Benders decomposition: the master is the extended MILP
+    (travel times as lags), which picks the machine sequences; the
+    subproblem (solve_transport_subproblem) assigns and sequences the
+    vehicles for them, looking only for plans that beat the best one, and
+    proves a bound S for those sequences. Every subproblem adds a cut: the
+    cut C >= S - (S - L) * (number of order binaries flipped), L the best
+    lower bound so far, if S > L, and otherwise a no-good that keeps the
+    master away from the sequences, which then bound the makespan by S
+    only. The lower bound is the smaller of the master's optimum and those
+    S; when the latter is smaller, the subproblem of the excluded sequences
+    runs again. The master also knows that the fleet needs
+    sum(loaded trips) / vehicles time. Sequences that come back get twice
+    the last subproblem time limit (subproblem_time_limit at first). The
+    search ends when the bounds meet or at time_limit.
+    travel_times defaults to the floor layout
+    (jssp_travel.travel_time_matrix) and is rounded up to whole time units.
+    callback(elapsed, makespan, start) and on_bound(elapsed, lower) report
+    improvements; initial_start gives the first machine sequences (the
+    best dispatching rule otherwise).
+
+    Returns a Schedule (lags = the loaded trips, model = the TransportPlan
+    with the vehicles), optimal when the master's bound meets it.
+    """
+    if vehicles < 1:
+        raise ValueError("vehicles must be at least 1, got {}".format(vehicles))
+    begin = time.perf_counter()
+    travel = _travel(travel_time_matrix() if travel_times is None else travel_times)
+    lags = travel_lags(machines, travel)
+    loaded = int(np.sum(lags))
+    lower = max(lower_bounds(times, machines, lags)['best'], math.ceil(loaded / vehicles))
+
+    if initial_start is None:
+        initial_start = dispatch_best(times, machines).start
+    best = dispatch_vehicles(times, machines, machine_sequences(initial_start, machines), travel, vehicles)
+    if best is None:
+        raise ValueError("initial_start orders some machines in a cycle")
+    best_makespan = _makespan(best, times)
+    if callback is not None:
+        callback(time.perf_counter() - begin, best_makespan, best[0].tolist())
+
+    master = build_job_scheduling_model(n, m, times, machines, time_limit=time_limit, horizon=best_makespan,
+                                        lags=lags, names=False)
+    master._c.LB = lower
+    iterations = cuts = 0
+    # Sequences the subproblem has seen -> [their bound, its last time limit, their no-good or None]
+    evaluated = {}
+    while lower < best_makespan:
+        remaining = time_limit - (time.perf_counter() - begin)
+        if remaining <= 0:
+            break
+        master.Params.TimeLimit = remaining
+        set_initial_schedule(master, n, m, times, machines, best[0])
+        master.optimize()
+        iterations += 1
+        if master.status in (GRB.INFEASIBLE, GRB.INF_OR_UNBD):
+            master_bound = best_makespan  # the cuts leave no sequences that could beat the best plan
+        elif master.status == GRB.OPTIMAL:
+            master_bound = math.ceil(master.ObjBound - 1e-6)
+        else:
+            break
+        # The master no longer sees the sequences behind a no-good; only their own bound covers them
+        excluded = [key for key, entry in evaluated.items() if entry[2] is not None]
+        bound = min([master_bound] + [evaluated[key][0] for key in excluded])
+        if bound > lower:
+            lower = min(bound, best_makespan)
+            master._c.LB = lower
+            if on_bound is not None:
+                on_bound(time.perf_counter() - begin, lower)
+        if lower >= best_makespan:
+            break
+        if bound < master_bound:
+            # Excluded sequences hold the bound down: give their subproblem more time
+            key = min(excluded, key=lambda key: evaluated[key][0])
+            master.remove(evaluated[key][2])
+        else:
+            key = tuple(map(tuple, Schedule.from_model(master, times, machines, lags).sequences()))
+        # Sequences only come back when their subproblem ran out of time, so it gets twice as long
+        limit = evaluated[key][1] * 2 if key in evaluated else subproblem_time_limit
+
+        # Only plans that beat the best one are of interest; proving there is none is the cut
+        greedy = dispatch_vehicles(times, machines, key, travel, vehicles)
+        remaining = time_limit - (time.perf_counter() - begin)
+        plan, bound = solve_transport_subproblem(times, machines, key, travel, vehicles, best_makespan - 1,
+                                                 min(limit, remaining), initial=greedy)
+        for candidate in (greedy, plan):
+            if candidate is not None and _makespan(candidate, times) < best_makespan:
+                best, best_makespan = candidate, _makespan(candidate, times)
+                master._c.UB = best_makespan
+                if callback is not None:
+                    callback(time.perf_counter() - begin, best_makespan, best[0].tolist())
+        bound = max(bound, evaluated[key][0] if key in evaluated else lower)
+        if bound > lower:
+            master.addConstr(master._c >= bound - (bound - lower) * _no_good(master, key))
+            no_good = None
+        else:
+            # A bound the master already has would change nothing, so the sequences are set aside
+            no_good = master.addConstr(_no_good(master, key) >= 1)
+        cuts += 1
+        evaluated[key] = [bound, limit, no_good]
+
+    start, vehicle, departure = best
+    plan = TransportPlan(vehicle, departure, machines, travel, vehicles)
+    plan.iterations, plan.cuts = iterations, cuts
+    return Schedule(start, times, machines, lags, bound=lower, optimal=lower >= best_makespan, solver='benders',
+                    runtime=time.perf_counter() - begin, model=plan)
+
+
+if __name__ == "__main__":
+    import os
+
+    from jssp_benchmark import DATA_DIR
+    from jssp_instance import load_instance
+
+    gp.setParam('OutputFlag', 0)
+    n, m, times, machines = load_instance(os.path.join(DATA_DIR, 'ft06.txt')).to_lists()
+    for vehicles in (2, 3):
+        schedule = solve_job_scheduling_agv(n, m, times, machines, vehicles=vehicles, time_limit=120)
+        plan = schedule.model
+        print("{} vehicles: makespan {}, lower bound {}, optimal {}, {} iterations, {} cuts in {:.2f}s".format(
+            vehicles, schedule.makespan, schedule.bound, schedule.optimal, plan.iterations, plan.cuts,
+            schedule.runtime))
+        for message in schedule.violations() + plan.violations(schedule.start, times):
+            print("Infeasible:", message)
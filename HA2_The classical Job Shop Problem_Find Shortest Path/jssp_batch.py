@@ -0,0 +1,88 @@
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from jssp_benchmark import FIELDS, SCHEDULERS, SOLVERS, run_instance, write_csv, write_json
+from jssp_instance import DEFAULT_CACHE_DIR, list_instances, read_instance
+
+
+def split_cores(jobs, workers=None, threads=None, cores=None):
+    """Choose (worker processes, Gurobi Threads per model) for a batch.
+
+    By default every core is used: small batches get several threads per
+    model, large batches one single-threaded model per core.
+    """
+    cores = cores or os.cpu_count() or 1
+    if workers is None and threads is None:
+        workers = max(1, min(jobs, cores))
+    if workers is None:
+        workers = max(1, cores // threads)
+    if threads is None:
+        threads = max(1, cores // workers)
+    return workers, threads
+
+
+def _solve_ref(file_path, index, solver, time_limit, threads, cache_dir):
+    # Runs in a worker: re-open the instance at its position in the bundle index instead
+    # of shipping its arrays through the pipe (names may repeat within a bundle)
+    instance = read_instance(file_path, index, cache_dir)
+    record = run_instance(instance, solver, time_limit, threads=threads)
+    record['source'] = file_path
+    return record
+
+
+def iter_batch_results(sources, solver='milp', workers=None, threads=None, time_limit=20 * 60,
+                       cache_dir=DEFAULT_CACHE_DIR):
+    """Solve every instance of the given files/directories/globs in a process pool.
+
+    Records are yielded as soon as each instance finishes, not in input order.
+    cache_dir holds the bundle indexes and parsed instances (None: no cache).
+    """
+    refs = [ref for source in sources for ref in list_instances(source, cache_dir=cache_dir)]
+    if not refs:
+        return
+    workers, threads = split_cores(len(refs), workers, threads)
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = {pool.submit(_solve_ref, file_path, index, solver, time_limit, threads, cache_dir):
+                   (file_path, name) for file_path, index, name in refs}
+        for future in as_completed(futures):
+            file_path, name = futures[future]
+            try:
+                yield future.result()
+            except Exception as exc:  # a crashed worker should not sink the whole batch
+                record = dict.fromkeys(FIELDS)
+                record.update(instance=name, solver=solver, source=file_path, status='error',
+                              error='{}: {}'.format(type(exc).__name__, exc))
+                yield record
+
+
+def solve_batch(sources, solver='milp', workers=None, threads=None, time_limit=20 * 60,
+                cache_dir=DEFAULT_CACHE_DIR):
+    return list(iter_batch_results(sources, solver, workers, threads, time_limit, cache_dir))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Solve many JSSP instances in parallel')
+    parser.add_argument('sources', nargs='+', help='instance files, bundled suite files, directories or globs')
+    parser.add_argument('--solver', default='milp', choices=sorted(list(SOLVERS) + list(SCHEDULERS)))
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: derived from cores)')
+    parser.add_argument('--threads', type=int, default=None, help='Gurobi Threads per model (default: derived)')
+    parser.add_argument('--time-limit', type=float, default=20 * 60)
+    parser.add_argument('--json', default='batch.json')
+    parser.add_argument('--csv', default=None)
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='bundle indexes and parsed instances')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    records = []
+    for record in iter_batch_results(args.sources, args.solver, args.workers, args.threads, args.time_limit,
+                                     args.cache_dir):
+        records.append(record)
+        print('[{:7.1f}s] {} {} makespan={} runtime={}s'.format(
+            time.perf_counter() - start, record['instance'], record['status'], record['makespan'], record['runtime']))
+    write_json(records, args.json)
+    if args.csv:
+        write_csv(records, args.csv, FIELDS + ['source'])
@@ -0,0 +1,383 @@
+import argparse
+import csv
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+import gurobipy as gp
+from gurobipy import GRB
+
+from jssp_cache import ScheduleCache, schedule_key
+from jssp_cp import solve_job_scheduling_cp
+from jssp_instance import load_instance
+from jssp_bounds import lower_bounds
+from jssp_heuristics import dispatch_best
+from jssp_milp import (build_job_scheduling_model, build_model, consistent_start, proven_optimal, set_initial_schedule,
+                       solve_job_scheduling, stop_at_lower_bound, template_model)
+from jssp_portfolio import run_portfolio
+from jssp_progress import ProgressRecorder, time_to_first, time_to_within
+from jssp_schedule import Schedule
+from jssp_shifting import shifting_bottleneck
+from jssp_tabu import tabu_search
+from jssp_z3 import solve_job_scheduling_z3
+
+try:
+    import resource
+except ImportError:  # Windows has no getrusage
+    resource = None
+
+# The instance files ship in the repository root
+DATA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Optimal makespans of the shipped instances (all proven optimal in the literature)
+BEST_KNOWN = {
+    'ft06': 55,
+    'ft10': 930,
+    'la01': 666,
+    'la04': 590,
+    'la05': 593,
+    'la08': 863,
+}
+
+def build_warm_started_model(n, m, times, machines, time_limit=20 * 60):
+    # Compact MILP with the best dispatching-rule schedule as MIP start and horizon;
+    # the heuristic counts as build time
+    begin = time.perf_counter()
+    start = consistent_start(n, m, times, machines, dispatch_best(times, machines).start)
+    horizon = int((start + np.asarray(times)).max())
+    model = build_job_scheduling_model(n, m, times, machines, time_limit=time_limit, horizon=horizon)
+    set_initial_schedule(model, n, m, times, machines, start)
+    model._build_time = time.perf_counter() - begin
+    return model
+
+
+def _tabu(n, m, times, machines, time_limit=20 * 60, callback=None):
+    return tabu_search(n, m, times, machines, time_limit=time_limit, on_improvement=callback,
+                       lower_bound=lower_bounds(times, machines)['best'])
+
+
+def _shifting_bottleneck(n, m, times, machines, time_limit=20 * 60, callback=None):
+    return shifting_bottleneck(n, m, times, machines, time_limit=time_limit)
+
+
+# Most entries only build the model; the harness optimizes it itself so it can time the build
+# separately. The SELF_SOLVING ones build and optimize in one call and return a Schedule with the
+# model in schedule.model: 'milp' is solve_job_scheduling as shipped (heuristic horizon, MIP start,
+# stop at the lower bound), 'milp_serial' the bare compact model with the serial horizon
+SOLVERS = {
+    'milp': solve_job_scheduling,
+    'milp_serial': build_job_scheduling_model,
+    'milp_indicator': partial(build_job_scheduling_model, disjunctive='indicator'),
+    'milp_full': partial(build_job_scheduling_model, disjunctive='full'),
+    'milp_matrix': partial(build_job_scheduling_model, vectorized=True, names=False),
+    'milp_warm': build_warm_started_model,
+    'milp_time_indexed': partial(build_model, formulation='time_indexed'),
+    'milp_rank': partial(build_model, formulation='rank'),
+    'milp_auto': partial(build_model, formulation='auto'),
+    'milp_template': template_model,  # reused across same-shape instances within one process
+}
+
+SELF_SOLVING = {'milp'}
+
+# Solvers without a Gurobi model: called as solver(n, m, times, machines, time_limit, callback)
+# and return a Schedule; callback(elapsed, makespan, start) reports every improvement
+SCHEDULERS = {
+    'cp': solve_job_scheduling_cp,
+    'tabu': _tabu,
+    'shifting_bottleneck': _shifting_bottleneck,
+    'z3': solve_job_scheduling_z3,
+    'z3_linear': partial(solve_job_scheduling_z3, strategy='linear'),
+    'portfolio': run_portfolio,
+}
+
+# Schedulers that also prove lower bounds as they go, through on_bound(elapsed, lower)
+BOUNDING_SCHEDULERS = {'cp', 'z3', 'z3_linear', 'portfolio'}
+
+STATUS_NAMES = {
+    GRB.OPTIMAL: 'optimal',
+    GRB.INFEASIBLE: 'infeasible',
+    GRB.INF_OR_UNBD: 'inf_or_unbd',
+    GRB.UNBOUNDED: 'unbounded',
+    GRB.TIME_LIMIT: 'time_limit',
+    GRB.NODE_LIMIT: 'node_limit',
+    GRB.SOLUTION_LIMIT: 'solution_limit',
+    GRB.INTERRUPTED: 'interrupted',
+}
+
+FIELDS = ['instance', 'solver', 'n', 'm', 'status', 'makespan', 'best_bound', 'lower_bound', 'best_known', 'check',
+          'gap', 'build_time', 'time_to_first', 'time_to_1pct', 'time_to_optimal', 'runtime', 'nodes', 'peak_rss_kb', 'error']
+
+
+def _peak_rss_kb():
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # kilobytes on Linux
+
+
+def check_result(makespan, status, best_known):
+    # Compare a run with the best known makespan of its instance
+    if makespan is None:
+        return 'no_solution'
+    if best_known is None:
+        return 'unknown'
+    if makespan < best_known:
+        return 'below_best_known'  # the model must be missing a constraint
+    if makespan == best_known:
+        return 'ok'
+    if status == 'optimal':
+        return 'wrong_optimum'
+    return 'above_best_known'
+
+
+def run_one(file_path, solver, time_limit=20 * 60, verbose=False, progress_dir=None, cache_dir=None):
+    """Build and solve one instance file with one solver and return a result record."""
+    cache = ScheduleCache(cache_dir) if cache_dir is not None else None
+    return run_instance(load_instance(file_path), solver, time_limit, verbose=verbose, progress_dir=progress_dir,
+                        cache=cache)
+
+
+def run_instance(instance, solver, time_limit=20 * 60, threads=None, verbose=False, progress_dir=None, cache=None):
+    # Same as run_one for an already loaded JobShopInstance; threads caps Gurobi's Threads.
+    # With progress_dir the incumbent/bound trajectory goes to <instance>-<solver>.jsonl there.
+    # With a ScheduleCache a proven optimum of the same instance and solver is reported
+    # without solving, and every result is stored
+    record = dict.fromkeys(FIELDS)
+    record.update(instance=instance.name, solver=solver, n=instance.n, m=instance.m,
+                  best_known=BEST_KNOWN.get(instance.name))
+    progress_path = None
+    if progress_dir is not None:
+        os.makedirs(progress_dir, exist_ok=True)
+        progress_path = os.path.join(progress_dir, '{}-{}.jsonl'.format(instance.name, solver))
+        if os.path.exists(progress_path):
+            os.remove(progress_path)
+    callback = ProgressRecorder(progress_path)
+
+    try:
+        n, m, times, machines = instance.to_lists()
+        record['lower_bound'] = lower_bound = lower_bounds(times, machines)['best']
+        key = schedule_key(times, machines, solver=solver)
+        if cache is not None:
+            hit = cache.schedule(key, times, machines)
+            if hit is not None and hit.optimal:
+                callback.close()
+                record.update(build_time=0.0, peak_rss_kb=_peak_rss_kb())
+                return _schedule_record(record, hit, [])
+        if solver in SCHEDULERS:
+            return _run_scheduler(record, solver, n, m, times, machines, time_limit, callback, cache, key)
+        if solver in SELF_SOLVING:
+            model = _solve_milp(solver, n, m, times, machines, time_limit, callback, verbose, threads)
+            if model is None:
+                callback.close()
+                record.update(status='time_limit', runtime=time_limit, build_time=0.0, peak_rss_kb=_peak_rss_kb(),
+                              check=check_result(None, 'time_limit', record['best_known']))
+                return record
+        else:
+            model = SOLVERS[solver](n, m, times, machines, time_limit=time_limit)
+            model.Params.OutputFlag = 1 if verbose else 0
+            if threads:
+                model.Params.Threads = threads
+            model._lower_bound = lower_bound
+            model.optimize(stop_at_lower_bound(lower_bound, callback))
+    except Exception as exc:  # license limits, out of memory, ...
+        callback.close()
+        record.update(status='error', error='{}: {}'.format(type(exc).__name__, exc), peak_rss_kb=_peak_rss_kb())
+        return record
+
+    callback.finish(model)
+    # A run stopped because the incumbent met the lower bound counts as optimal
+    record['status'] = 'optimal' if proven_optimal(model) else STATUS_NAMES.get(model.status, str(model.status))
+    record['build_time'] = round(model._build_time, 4)
+    record['runtime'] = round(model.Runtime, 4)
+    if model.SolCount > 0:
+        record['makespan'] = int(round(model.ObjVal))
+        record['best_bound'] = max(model.ObjBound, lower_bound)
+        record['gap'] = (model.ObjVal - record['best_bound']) / max(abs(model.ObjVal), 1e-10)
+        # Presolve can find the optimum before any callback fires; finish() then records it at the end
+        record['time_to_first'] = round(time_to_first(callback.records), 4)
+        within = time_to_within(callback.records, 1, record['best_known'])
+        record['time_to_1pct'] = round(within, 4) if within is not None else None
+    if record['status'] == 'optimal':
+        record['time_to_optimal'] = record['runtime']
+    record['nodes'] = int(model.NodeCount)
+    record['check'] = check_result(record['makespan'], record['status'], record['best_known'])
+    if model.SolCount > 0:
+        schedule = Schedule.from_model(model, times, machines, bound=math.ceil(record['best_bound'] - 1e-6),
+                                       optimal=record['status'] == 'optimal', solver=solver)
+        if not schedule.is_feasible():
+            record['check'] = 'invalid_schedule'  # the model lets through a schedule that breaks the constraints
+        elif cache is not None:
+            cache.put(key, schedule)
+    record['peak_rss_kb'] = _peak_rss_kb()
+    if getattr(model, '_template', None) is None:
+        model.dispose()
+    return record
+
+
+def _solve_milp(solver, n, m, times, machines, time_limit, recorder, verbose=False, threads=None):
+    # run_instance for the SELF_SOLVING entries; the model is built inside the call, so Gurobi's
+    # defaults carry the output and thread settings, and everything before optimize counts as build
+    gp.setParam('OutputFlag', 1 if verbose else 0)
+    if threads:
+        gp.setParam('Threads', threads)
+    try:
+        begin = time.perf_counter()
+        schedule = SOLVERS[solver](n, m, times, machines, time_limit=time_limit, callback=recorder)
+        wall = time.perf_counter() - begin
+    finally:
+        gp.resetParams()
+    if schedule is None:
+        return None
+    model = schedule.model
+    model._build_time = max(wall - model.Runtime, 0.0)
+    return model
+
+
+def _run_scheduler(record, solver, n, m, times, machines, time_limit, recorder, cache=None, key=None):
+    # run_instance for the SCHEDULERS: the schedule is all there is to report
+    state = {'incumbent': None, 'bound': None}
+
+    def on_solution(elapsed, makespan, start):
+        state['incumbent'] = makespan
+        recorder.add(elapsed, 'solution', makespan, state['bound'], 0)
+
+    def on_bound(elapsed, lower):
+        state['bound'] = lower
+        recorder.add(elapsed, 'bound', state['incumbent'], lower, 0)
+
+    options = {'on_bound': on_bound} if solver in BOUNDING_SCHEDULERS else {}
+    schedule = SCHEDULERS[solver](n, m, times, machines, time_limit=time_limit, callback=on_solution, **options)
+    recorder.close()
+    record['build_time'] = 0.0
+    record['peak_rss_kb'] = _peak_rss_kb()
+    if schedule is None:
+        record.update(status='time_limit', runtime=time_limit,
+                      check=check_result(None, 'time_limit', record['best_known']))
+        return record
+    if cache is not None and schedule.is_feasible():
+        cache.put(key, schedule)
+    return _schedule_record(record, schedule, recorder.records)
+
+
+def _schedule_record(record, schedule, records):
+    # Fill a result record from a Schedule and its progress records
+    record['status'] = 'optimal' if schedule.optimal else 'feasible'
+    record['runtime'] = round(schedule.runtime, 4)
+    record['makespan'] = schedule.makespan
+    record['best_bound'] = max(schedule.bound or 0, record['lower_bound'])
+    record['gap'] = (schedule.makespan - record['best_bound']) / max(schedule.makespan, 1)
+    first = time_to_first(records)
+    record['time_to_first'] = round(first if first is not None else schedule.runtime, 4)
+    within = time_to_within(records, 1, record['best_known'])
+    record['time_to_1pct'] = round(within, 4) if within is not None else None
+    if schedule.optimal:
+        record['time_to_optimal'] = record['runtime']
+    record['nodes'] = getattr(schedule.model, 'nodes', None)
+    record['check'] = check_result(record['makespan'], record['status'], record['best_known'])
+    if not schedule.is_feasible():
+        record['check'] = 'invalid_schedule'
+    return record
+
+
+def run_benchmark(instances=None, solvers=None, data_dir=DATA_DIR, time_limit=20 * 60, isolate=True, verbose=False,
+                  progress_dir=None, cache_dir=None):
+    """Run every solver over every instance, one after the other.
+
+    With isolate=True each run gets a fresh process, so peak RSS belongs to
+    that run alone and timings do not share a warm interpreter.
+    """
+    instances = instances or sorted(BEST_KNOWN)
+    solvers = solvers or list(SOLVERS) + list(SCHEDULERS)
+    jobs = [(os.path.join(data_dir, name + '.txt'), solver) for name in instances for solver in solvers]
+    records = []
+    if isolate:
+        context = multiprocessing.get_context('spawn')
+        for file_path, solver in jobs:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                records.append(pool.submit(run_one, file_path, solver, time_limit, verbose, progress_dir,
+                                           cache_dir).result())
+    else:
+        for file_path, solver in jobs:
+            records.append(run_one(file_path, solver, time_limit, verbose, progress_dir, cache_dir))
+    return records
+
+
+def write_json(records, file_path):
+    with open(file_path, 'w') as file:
+        json.dump({'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'records': records}, file, indent=2)
+
+
+def read_json(file_path):
+    with open(file_path) as file:
+        return json.load(file)['records']
+
+
+def write_csv(records, file_path, fields=FIELDS):
+    with open(file_path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=fields, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(records)
+
+
+def compare_runs(baseline, records, tolerance=0.25, min_seconds=0.5):
+    """List the runs that got worse than in the baseline records.
+
+    A run regresses when it loses optimality, ends with a worse makespan, or
+    its build time / time to optimal grows by more than tolerance (relative)
+    and min_seconds (absolute).
+    """
+    previous = {(r['instance'], r['solver']): r for r in baseline}
+    regressions = []
+    for record in records:
+        old = previous.get((record['instance'], record['solver']))
+        if old is None:
+            continue
+        label = '{} / {}'.format(record['instance'], record['solver'])
+        if old['status'] == 'optimal' and record['status'] != 'optimal':
+            regressions.append('{}: no longer optimal ({})'.format(label, record['status']))
+        if old['makespan'] is not None and (record['makespan'] is None or record['makespan'] > old['makespan']):
+            regressions.append('{}: makespan {} -> {}'.format(label, old['makespan'], record['makespan']))
+        for field in ('build_time', 'time_to_optimal'):
+            before, after = old[field], record[field]
+            if before is None or after is None:
+                continue
+            if after - before > min_seconds and after > before * (1 + tolerance):
+                regressions.append('{}: {} {:.2f}s -> {:.2f}s'.format(label, field, before, after))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the JSSP solvers on the shipped instances')
+    parser.add_argument('--instances', nargs='*', default=None, help='instance names (default: all with a known optimum)')
+    parser.add_argument('--solvers', nargs='*', default=None, choices=sorted(list(SOLVERS) + list(SCHEDULERS)))
+    parser.add_argument('--time-limit', type=float, default=20 * 60)
+    parser.add_argument('--json', default='benchmark.json', help='where to write the JSON results')
+    parser.add_argument('--csv', default=None, help='also write the results as CSV')
+    parser.add_argument('--baseline', default=None, help='earlier JSON results to check for regressions')
+    parser.add_argument('--no-isolate', action='store_true', help='run everything in this process')
+    parser.add_argument('--verbose', action='store_true', help='show the Gurobi log')
+    parser.add_argument('--progress', default=None, help='directory for the incumbent/bound trajectories (JSONL)')
+    parser.add_argument('--cache', default=None, help='schedule cache directory; proven optima there are not re-solved')
+    args = parser.parse_args()
+
+    records = run_benchmark(args.instances, args.solvers, time_limit=args.time_limit,
+                            isolate=not args.no_isolate, verbose=args.verbose, progress_dir=args.progress,
+                            cache_dir=args.cache)
+    for r in records:
+        print('{instance:>6} {solver:>5} {status:>12} makespan={makespan} best_known={best_known} '
+              'check={check} build={build_time}s first={time_to_first}s 1%={time_to_1pct}s optimal={time_to_optimal}s '
+              'nodes={nodes} rss={peak_rss_kb}KB'.format(**r))
+    write_json(records, args.json)
+    if args.csv:
+        write_csv(records, args.csv)
+
+    failed = [r for r in records if r['check'] in ('below_best_known', 'wrong_optimum', 'invalid_schedule')]
+    regressions = compare_runs(read_json(args.baseline), records) if args.baseline else []
+    for message in regressions:
+        print('REGRESSION', message)
+    sys.exit(1 if failed or regressions else 0)
@@ -0,0 +1,89 @@
+import heapq
+import math
+
+import numpy as np
+
+
+def operation_heads_tails(times, lags=None):
+    """Heads and tails of every operation implied by the job routes alone.
+
+    head[j, k] is the earliest start of operation k of job j, tail[j, k] the
+    work (and lags) that must still follow it. Lags are rounded up as in the
+    integral MILP.
+    """
+    times = np.asarray(times, dtype=np.int64)
+    n, m = times.shape
+    delay = times.copy()
+    if lags is not None and m > 1:
+        delay[:, :-1] += np.ceil(np.asarray(lags, dtype=float).reshape(n, m - 1)).astype(np.int64)
+    head = np.zeros((n, m), dtype=np.int64)
+    head[:, 1:] = np.cumsum(delay[:, :-1], axis=1)
+    tail = np.cumsum(delay[:, ::-1], axis=1)[:, ::-1] - times
+    return head, tail
+
+
+def job_bound(times, lags=None):
+    # No job can finish before all its own operations are done
+    head, tail = operation_heads_tails(times, lags)
+    return int((head[:, 0] + tail[:, 0] + np.asarray(times)[:, 0]).max())
+
+
+def machine_bound(times, machines, lags=None):
+    # Every machine has to process its whole load, after the smallest head and before the smallest tail
+    times = np.asarray(times)
+    machines = np.asarray(machines)
+    head, tail = operation_heads_tails(times, lags)
+    bound = 0
+    for i in range(machines.shape[1]):
+        on_i = machines == i
+        bound = max(bound, int(head[on_i].min() + times[on_i].sum() + tail[on_i].min()))
+    return bound
+
+
+def jackson_preemptive(release, processing, tails):
+    # Jackson's preemptive schedule: always run the available operation with the largest
+    # tail. Its max(completion + tail) is the optimum of the preemptive one-machine problem.
+    order = sorted(range(len(release)), key=lambda o: release[o])
+    remaining = list(processing)
+    heap = []
+    t = 0
+    i = 0
+    bound = 0
+    while i < len(order) or heap:
+        if not heap:
+            t = max(t, release[order[i]])
+        while i < len(order) and release[order[i]] <= t:
+            heapq.heappush(heap, (-tails[order[i]], order[i]))
+            i += 1
+        o = heap[0][1]
+        next_release = release[order[i]] if i < len(order) else math.inf
+        run = min(remaining[o], next_release - t)
+        t += run
+        remaining[o] -= run
+        if remaining[o] == 0:
+            heapq.heappop(heap)
+            bound = max(bound, t + tails[o])
+    return bound
+
+
+def jackson_bound(times, machines, lags=None):
+    # Best one-machine preemptive relaxation over all machines
+    times = np.asarray(times)
+    machines = np.asarray(machines)
+    head, tail = operation_heads_tails(times, lags)
+    bound = 0
+    for i in range(machines.shape[1]):
+        on_i = machines == i
+        bound = max(bound, jackson_preemptive(head[on_i].tolist(), times[on_i].tolist(), tail[on_i].tolist()))
+    return int(bound)
+
+
+def lower_bounds(times, machines, lags=None):
+    """All bounds for an instance; 'best' is the largest of them."""
+    bounds = {
+        'job': job_bound(times, lags),
+        'machine': machine_bound(times, machines, lags),
+        'jackson': jackson_bound(times, machines, lags),
+    }
+    bounds['best'] = max(bounds.values())
+    return bounds
@@ -0,0 +1,177 @@
+import functools
+import hashlib
+import inspect
+import json
+import os
+import time
+
+import numpy as np
+
+from jssp_instance import DEFAULT_CACHE_DIR
+from jssp_schedule import Schedule
+
+DEFAULT_SCHEDULE_DIR = os.path.join(DEFAULT_CACHE_DIR, 'schedules')
+
+# Arguments that change how long a solver runs or whom it tells, not what it solves
+VOLATILE_OPTIONS = frozenset(('n', 'm', 'times', 'machines', 'lags', 'time_limit', 'callback', 'on_bound', 'poll',
+                              'initial_start', 'on_improvement', 'grace', 'cache', 'node_limit'))
+
+
+def _normalize(value):
+    # JSON-stable form of a solver option; functions by name, arrays as lists
+    if callable(value):
+        return '{}.{}'.format(getattr(value, '__module__', ''), getattr(value, '__qualname__', repr(value)))
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    return value
+
+
+def schedule_key(times, machines, lags=None, solver='milp', options=None):
+    """Hash of the normalized instance arrays, the solver and its options.
+
+    Arrays are hashed the way JobShopInstance.digest does, so the key does
+    not depend on list vs array input or on the file an instance came from.
+    """
+    times = np.asarray(times)
+    h = hashlib.sha1()
+    h.update(np.array(times.shape, dtype='<i4').tobytes())
+    h.update(np.ascontiguousarray(machines, dtype='<i4').tobytes())
+    h.update(np.ascontiguousarray(times, dtype='<i4').tobytes())
+    if lags is not None:
+        h.update(np.ascontiguousarray(lags, dtype='<f8').tobytes())
+    options = {k: v for k, v in (options or {}).items() if k not in VOLATILE_OPTIONS}
+    h.update(json.dumps([solver, _normalize(options)], sort_keys=True).encode())
+    return h.hexdigest()
+
+
+class ScheduleCache:
+    """Best schedules on disk, one JSON file per key, at most max_entries of them.
+
+    An entry holds the schedule's start times, makespan, bound and whether
+    it is proven optimal. Reading an entry touches its file, and storing
+    one beyond max_entries deletes the files that were used least recently
+    (LRU by modification time, so several processes can share one folder).
+    """
+
+    def __init__(self, cache_dir=DEFAULT_SCHEDULE_DIR, max_entries=1000):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + '.json')
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path) as file:
+                entry = json.load(file)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def schedule(self, key, times, machines, lags=None):
+        # The cached entry as a Schedule, or None
+        entry = self.get(key)
+        if entry is None:
+            return None
+        return Schedule(entry['start'], times, machines, lags, bound=entry['bound'], optimal=entry['optimal'],
+                        solver=entry['solver'], runtime=0.0)
+
+    def put(self, key, schedule):
+        """Store schedule unless the entry already has a better one; returns the entry kept."""
+        old = self.get(key)
+        # An optimal schedule proves its makespan is a bound as well; keep the best bound seen
+        bounds = [b for b in (schedule.bound, schedule.makespan if schedule.optimal else None,
+                              old['bound'] if old is not None else None) if b is not None]
+        bound = max(bounds) if bounds else None
+        if old is not None and (old['optimal'] or old['makespan'] <= schedule.makespan):
+            optimal = old['optimal'] or (bound is not None and bound >= old['makespan'])
+            if bound != old['bound'] or optimal != old['optimal']:
+                old['bound'] = bound
+                old['optimal'] = optimal
+                self._write(key, old)
+            return old
+        entry = {'makespan': schedule.makespan, 'bound': bound,
+                 'optimal': bool(schedule.optimal or (bound is not None and bound >= schedule.makespan)),
+                 'solver': schedule.solver, 'start': np.asarray(schedule.start).tolist(),
+                 'stored': time.strftime('%Y-%m-%dT%H:%M:%S')}
+        self._write(key, entry)
+        self._evict()
+        return entry
+
+    def _write(self, key, entry):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        # Write to a temporary file first so concurrent readers never see half a file
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp_path, 'w') as file:
+            json.dump(entry, file)
+        os.replace(tmp_path, path)
+
+    def _evict(self):
+        try:
+            names = [name for name in os.listdir(self.cache_dir) if name.endswith('.json')]
+        except OSError:
+            return
+        if len(names) <= self.max_entries:
+            return
+        paths = [os.path.join(self.cache_dir, name) for name in names]
+        ages = {}
+        for path in paths:
+            try:
+                ages[path] = os.path.getmtime(path)
+            except OSError:
+                pass  # evicted by another process meanwhile
+        for path in sorted(ages, key=ages.get)[:len(ages) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def __len__(self):
+        try:
+            return sum(name.endswith('.json') for name in os.listdir(self.cache_dir))
+        except OSError:
+            return 0
+
+
+def cached(solver):
+    """Give a solver entry point a cache=None argument (a ScheduleCache).
+
+    With a cache, a proven-optimal entry is returned without solving, any
+    other entry becomes initial_start (if the solver takes one and the
+    caller gave none), and the result is stored afterwards.
+    """
+    def decorate(function):
+        signature = inspect.signature(function)
+        warm_start = 'initial_start' in signature.parameters
+
+        @functools.wraps(function)
+        def wrapper(*args, cache=None, **kwargs):
+            if cache is None:
+                return function(*args, **kwargs)
+            call = signature.bind(*args, **kwargs)
+            call.apply_defaults()
+            arguments = dict(call.arguments)
+            options = dict(arguments.pop('options', {}), **arguments)  # **options of solve_job_scheduling
+            times, machines, lags = arguments['times'], arguments['machines'], options.get('lags')
+            key = schedule_key(times, machines, lags, solver, options)
+
+            hit = cache.schedule(key, times, machines, lags)
+            if hit is not None and hit.optimal:
+                hit.history = [(0.0, hit.makespan)]  # found at once
+                return hit
+            if hit is not None and warm_start and call.arguments['initial_start'] is None:
+                call.arguments['initial_start'] = hit.start
+
+            schedule = function(*call.args, **call.kwargs)
+            if schedule is not None:
+                cache.put(key, schedule)
+            return schedule
+        return wrapper
+    return decorate
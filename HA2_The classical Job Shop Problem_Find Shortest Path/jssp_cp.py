@@ -0,0 +1,411 @@
+import time
+
+import numpy as np
+
+from jssp_bounds import lower_bounds
+from jssp_cache import cached
+from jssp_heuristics import dispatch_best
+from jssp_schedule import Schedule, makespan_of
+from jssp_tabu import tabu_search
+
+INF = float('inf')
+
+
+# Disjunctive (unary resource) filtering rules. Each gets the earliest starts, latest
+# completions and durations of the operations on one machine and returns their new
+# earliest starts, or None when the operations cannot all fit. The same rules update the
+# latest completions when run on the mirrored problem (see _mirrored).
+def _edge_finding(est, lct, p):
+    # Baptiste & Le Pape's O(n^2) edge finding: if i cannot end before the set of operations
+    # with lct <= lct_k, it goes after all of them (with the overload check on the way)
+    order = sorted(range(len(est)), key=est.__getitem__)
+    new = list(est)
+    ect_from = [0] * len(est)
+    for d_k in set(lct):
+        total = 0
+        ect = -INF
+        for i in reversed(order):
+            if lct[i] <= d_k:
+                total += p[i]
+                if est[i] + total > ect:
+                    ect = est[i] + total
+                    if ect > d_k:
+                        return None
+            ect_from[i] = ect
+        head = -INF
+        for i in order:
+            if lct[i] <= d_k:
+                if est[i] + total > head:
+                    head = est[i] + total
+                total -= p[i]
+            else:
+                if est[i] + total + p[i] > d_k and ect_from[i] > new[i]:
+                    new[i] = ect_from[i]
+                if head + p[i] > d_k and ect > new[i]:
+                    new[i] = ect
+    return new
+
+
+def _detectable_precedences(est, lct, p):
+    # j must precede i when i cannot end before j has to start (ect_i > lst_j)
+    order = sorted(range(len(est)), key=est.__getitem__, reverse=True)
+    new = list(est)
+    for i in range(len(est)):
+        ect_i = est[i] + p[i]
+        total = 0
+        ect = -INF
+        for j in order:
+            if j != i and lct[j] - p[j] < ect_i:
+                total += p[j]
+                if est[j] + total > ect:
+                    ect = est[j] + total
+        if ect > new[i]:
+            new[i] = ect
+    return new
+
+
+def _not_first(est, lct, p):
+    # If the operations that could still run after est_i cannot all start after i ends,
+    # one of them comes first and i waits at least for the earliest of them to end
+    order = sorted(range(len(est)), key=lct.__getitem__)
+    new = list(est)
+    for i in range(len(est)):
+        total = 0
+        latest_start = INF
+        earliest_end = INF
+        for j in order:
+            if j != i and est[j] + p[j] > est[i]:
+                total += p[j]
+                if lct[j] - total < latest_start:
+                    latest_start = lct[j] - total
+                if est[j] + p[j] < earliest_end:
+                    earliest_end = est[j] + p[j]
+        if latest_start < est[i] + p[i] and earliest_end > new[i]:
+            new[i] = earliest_end
+    return new
+
+
+def _mirrored(rule, est, lct, p):
+    # Run an est rule on the time-reversed problem to get new latest completions
+    new = rule([-d for d in lct], [-r for r in est], p)
+    return None if new is None else [-v for v in new]
+
+
+RULES = (_edge_finding, _not_first, _detectable_precedences)
+
+
+class JobShopCP:
+    """Constraint model of a job shop: one interval variable per operation.
+
+    Operation o = j*m + k has a fixed duration and a start domain
+    [est[o], lst[o]]. Job precedences and the makespan bound are propagated
+    directly, every machine is a disjunctive resource filtered with edge
+    finding, not-first/not-last and detectable precedences. The search ranks
+    the operations of a machine from the front: sequence[i] holds the ranked
+    prefix of machine i, which propagation chains and keeps ahead of the
+    unranked rest. All changes go through a trail, so the search can undo
+    them.
+    """
+
+    def __init__(self, n, m, times, machines, rules=RULES):
+        self.n, self.m = n, m
+        self.p = [int(t) for row in times for t in row]
+        self.machine = [int(i) for row in machines for i in row]
+        self.machine_ops = [[] for _ in range(m)]
+        for o, i in enumerate(self.machine):
+            self.machine_ops[i].append(o)
+        self.rules = rules
+        self.est = [0] * (n * m)
+        self.lst = [INF] * (n * m)
+        self.sequence = [[-1] * n for _ in range(m)]
+        self.ranked = [0] * m  # length of the ranked prefix of every machine
+        self.is_ranked = [False] * (n * m)
+        self.trail = []
+        self.filtered = [None] * m  # domains of every machine the last time its rules ran
+        self.upper = INF  # every operation has to end by this
+        self._dirty_jobs = set(range(n))
+        self._dirty_machines = set(range(m))
+
+    def _record(self, values, index, value):
+        self.trail.append((values, index, values[index]))
+        values[index] = value
+
+    def _set(self, values, o, value):
+        self._record(values, o, value)
+        self._dirty_jobs.add(o // self.m)
+        self._dirty_machines.add(self.machine[o])
+
+    def restart(self):
+        """Undo everything back to the root, with every job and machine due for propagation."""
+        self.undo(0)
+        self._dirty_jobs.update(range(self.n))
+        self._dirty_machines.update(range(self.m))
+
+    def undo(self, size):
+        trail = self.trail
+        while len(trail) > size:
+            values, index, old = trail.pop()
+            values[index] = old
+        self._dirty_jobs.clear()
+        self._dirty_machines.clear()
+
+    def set_upper(self, upper):
+        # Makespan must be at most upper: a deadline for the last operation of every job
+        self.upper = upper
+        m, p, lst = self.m, self.p, self.lst
+        for j in range(self.n):
+            o = j * m + m - 1
+            if lst[o] > upper - p[o]:
+                self._set(lst, o, upper - p[o])
+
+    def rank(self, o):
+        """Put o right after the ranked prefix of its machine (ahead of all unranked operations)."""
+        i = self.machine[o]
+        self._record(self.sequence[i], self.ranked[i], o)
+        self._record(self.ranked, i, self.ranked[i] + 1)
+        self._record(self.is_ranked, o, True)
+        self._dirty_machines.add(i)
+
+    def unranked(self, i):
+        return [o for o in self.machine_ops[i] if not self.is_ranked[o]]
+
+    def _chain(self, i):
+        # The ranked prefix runs in sequence order and ends before any unranked operation
+        # starts; False if that leaves some operation without a start time
+        p, est, lst = self.p, self.est, self.lst
+        sequence = self.sequence[i][:self.ranked[i]]
+        rest = self.unranked(i)
+        for a, b in zip(sequence, sequence[1:]):
+            if est[a] + p[a] > est[b]:
+                self._set(est, b, est[a] + p[a])
+        if sequence and rest:
+            last = sequence[-1]
+            for u in rest:
+                if est[last] + p[last] > est[u]:
+                    self._set(est, u, est[last] + p[last])
+            latest = min(lst[u] for u in rest)
+            if latest - p[last] < lst[last]:
+                self._set(lst, last, latest - p[last])
+        for a, b in zip(reversed(sequence[:-1]), reversed(sequence[1:])):
+            if lst[b] - p[a] < lst[a]:
+                self._set(lst, a, lst[b] - p[a])
+        return all(est[o] <= lst[o] for o in sequence)
+
+    def propagate(self):
+        """Run the propagators to a fixpoint; False if some domain became empty."""
+        m, p, est, lst = self.m, self.p, self.est, self.lst
+        jobs, machines = self._dirty_jobs, self._dirty_machines
+        while jobs or machines:
+            if jobs:
+                first = jobs.pop() * m
+                for o in range(first, first + m - 1):
+                    if est[o] + p[o] > est[o + 1]:
+                        self._set(est, o + 1, est[o] + p[o])
+                for o in range(first + m - 2, first - 1, -1):
+                    if lst[o + 1] - p[o] < lst[o]:
+                        self._set(lst, o, lst[o + 1] - p[o])
+                for o in range(first, first + m):
+                    if est[o] > lst[o]:
+                        return False
+                continue
+            i = machines.pop()
+            if self.ranked[i] and not self._chain(i):
+                return False
+            ops = self.machine_ops[i]
+            r = [est[o] for o in ops]
+            d = [lst[o] + p[o] for o in ops]
+            if (r, d) == self.filtered[i]:
+                continue  # only its own filtering changed the machine since the rules last ran
+            q = [p[o] for o in ops]
+            for rule in self.rules:
+                new_r = rule(r, d, q)
+                new_d = None if new_r is None else _mirrored(rule, r, d, q)
+                if new_d is None:
+                    return False
+                r, d = new_r, new_d
+            self.filtered[i] = (r, d)
+            for o, r_o, d_o in zip(ops, r, d):
+                if r_o > est[o]:
+                    self._set(est, o, r_o)
+                if d_o - p[o] < lst[o]:
+                    self._set(lst, o, d_o - p[o])
+                if est[o] > lst[o]:
+                    return False
+        return True
+
+    def branching_machine(self):
+        # The machine with the least slack among those with at least two unranked operations
+        chosen, chosen_slack = None, None
+        for i in range(self.m):
+            rest = self.unranked(i)
+            if len(rest) < 2:
+                continue
+            slack = (max(self.lst[o] + self.p[o] for o in rest) - min(self.est[o] for o in rest)
+                     - sum(self.p[o] for o in rest))
+            if chosen is None or slack < chosen_slack:
+                chosen, chosen_slack = i, slack
+        return chosen
+
+    def first_candidates(self, i):
+        # Unranked operations that can end before every other unranked one has to start
+        est, lst, p = self.est, self.lst, self.p
+        rest = self.unranked(i)
+        candidates = []
+        for o in rest:
+            if all(est[o] + p[o] <= lst[u] for u in rest if u != o):
+                candidates.append(o)
+        candidates.sort(key=lambda o: (est[o], lst[o]))
+        return candidates
+
+    def start_times(self):
+        return [[self.est[j * self.m + k] for k in range(self.m)] for j in range(self.n)]
+
+
+@cached('cp')
+def solve_job_scheduling_cp(n, m, times, machines, time_limit=20 * 60, callback=None, initial_start=None,
+                            rules=RULES, poll=None, on_bound=None, node_limit=1000):
+    """Minimize the makespan with constraint propagation and depth-first branch and bound.
+
+    Branching ranks machines from the front: take the machine with the least
+    slack and try each operation that can still go first among its unranked
+    ones, earliest start first. Once every machine is ranked the earliest
+    starts are a schedule, and every schedule tightens the makespan bound to
+    one below it. The search starts from initial_start, else from the best
+    schedule poll has (a dispatching rule if none yet) or a short tabu
+    search.
+
+    The lower bound is raised as in the z3 bisection: first every makespan
+    that propagation alone refutes at the root (destructive lower bounds),
+    then the search probes the middle of [lower bound, best - 1]. A probe
+    that finishes its tree proves the probe + 1 (or finds the optimum);
+    one that runs out of nodes is restarted with twice node_limit.
+    callback(elapsed, makespan, start) is called for every improving
+    schedule and on_bound(elapsed, lower) for every better lower bound.
+    poll() is called every 256 nodes and returns (makespan, start, lower)
+    found elsewhere (see jssp_portfolio). The clock is checked on every
+    node, so the solver returns within a node of time_limit.
+
+    Returns a Schedule: optimal when the bounds met, otherwise the best
+    found with the lower bound; model is the JobShopCP with its node count
+    in .nodes.
+
+    This is a pure-Python search of tens to hundreds of nodes per second:
+    it proves ft06 and the 10 x 5 la instances within seconds; on ft10 the
+    bound climbs from 808 to about 920 in two minutes, short of the
+    optimum 930. Θ-tree versions of the rules prune the same and
+    were slower at these machine sizes, so the rules stay quadratic and
+    only machines whose domains changed since their last run are filtered
+    again.
+    """
+    begin = time.perf_counter()
+    deadline = begin + time_limit
+    cp = JobShopCP(n, m, times, machines, rules)
+    lower = lower_bounds(times, machines)['best']
+    if initial_start is None and poll is not None:
+        # The other engines' schedules arrive through poll, so no tabu run of our own
+        initial_start = poll()[1] or dispatch_best(times, machines).start
+    elif initial_start is None:
+        initial_start = tabu_search(n, m, times, machines, time_limit=min(2.0, time_limit / 10),
+                                    lower_bound=lower).start
+    best = np.asarray(initial_start, dtype=np.int64).tolist()
+    best_makespan = int(makespan_of(best, times))
+    if callback is not None:
+        callback(time.perf_counter() - begin, best_makespan, best)
+    p, est = cp.p, cp.est
+    size = n * m
+    cp.nodes = 0
+
+    def raise_lower(proven):
+        nonlocal lower
+        if proven > lower:
+            lower = proven
+            if on_bound is not None:
+                on_bound(time.perf_counter() - begin, lower)
+
+    def search(probe, limit):
+        # Depth-first search for a schedule with makespan <= probe, tightened by every one found;
+        # 'complete' when the tree is exhausted, else 'limit', 'time' or 'met' (bounds met)
+        nonlocal best, best_makespan
+        cp.restart()
+        cp.set_upper(probe)
+        ok = cp.propagate()
+        stack = []  # choice points: [trail size, candidates, index of the candidate being tried]
+        count = 0
+        while True:
+            if ok:
+                if time.perf_counter() > deadline:
+                    return 'time'
+                cp.nodes += 1
+                count += 1
+                if count > limit:
+                    return 'limit'
+                if poll is not None and cp.nodes % 256 == 0:
+                    makespan, start, proven = poll()
+                    raise_lower(proven)
+                    if makespan is not None and makespan < best_makespan:
+                        best, best_makespan = start, makespan
+                        if best_makespan <= probe:
+                            cp.set_upper(best_makespan - 1)
+                            ok = cp.propagate()
+                    if best_makespan <= lower:
+                        return 'met'
+                    if not ok:
+                        continue
+                i = cp.branching_machine()
+                if i is None:
+                    # Every machine is ranked, so the earliest starts are a better schedule
+                    best = cp.start_times()
+                    best_makespan = max(est[o] + p[o] for o in range(size))
+                    if callback is not None:
+                        callback(time.perf_counter() - begin, best_makespan, best)
+                    if best_makespan <= lower:
+                        return 'met'
+                    ok = False
+                    continue
+                candidates = cp.first_candidates(i)
+                if not candidates:
+                    ok = False
+                    continue
+                stack.append([len(cp.trail), candidates, 0])
+                cp.rank(candidates[0])
+                ok = cp.propagate()
+                continue
+
+            # Dead end: undo to the last choice point with an untried candidate and rank that one
+            while stack and stack[-1][2] + 1 >= len(stack[-1][1]):
+                cp.undo(stack.pop()[0])
+            if not stack:
+                return 'complete'
+            point = stack[-1]
+            cp.undo(point[0])
+            point[2] += 1
+            cp.set_upper(min(probe, best_makespan - 1))  # the undo may have taken back a tighter bound
+            cp.rank(point[1][point[2]])
+            ok = cp.propagate()
+
+    # Destructive lower bounds: bisect on the makespans the root propagation refutes
+    low, high = lower, best_makespan - 1
+    while low <= high and time.perf_counter() < deadline:
+        probe = (low + high) // 2
+        cp.restart()
+        cp.set_upper(probe)
+        if cp.propagate():
+            high = probe - 1
+        else:
+            raise_lower(probe + 1)
+            low = probe + 1
+
+    while lower < best_makespan:
+        probe = (lower + best_makespan - 1) // 2
+        status = search(probe, node_limit)
+        if status == 'complete':
+            # Nothing (better) is left at or below the probe
+            raise_lower(min(probe, best_makespan - 1) + 1)
+        elif status == 'limit':
+            node_limit *= 2
+        else:
+            break
+
+    optimal = best_makespan <= lower
+    return Schedule(best, times, machines, bound=best_makespan if optimal else lower, optimal=optimal, solver='cp',
+                    runtime=time.perf_counter() - begin, model=cp)
@@ -0,0 +1,125 @@
+import time
+
+import numpy as np
+
+from jssp_schedule import Schedule
+
+
+# Priority rules for the Giffler-Thompson conflict set: the candidate with the smallest
+# key is scheduled. Each rule gets (jobs, ops, times, remaining, est) for the candidates,
+# where ops[i] is the next operation of jobs[i] and remaining[j, k] is the work of job j
+# from operation k to its end.
+def _spt(jobs, ops, times, remaining, est):
+    return times[jobs, ops]  # shortest processing time
+
+
+def _lpt(jobs, ops, times, remaining, est):
+    return -times[jobs, ops]  # longest processing time
+
+
+def _mwkr(jobs, ops, times, remaining, est):
+    return -remaining[jobs, ops]  # most work remaining, counting this operation
+
+
+def _lrpt(jobs, ops, times, remaining, est):
+    return -(remaining[jobs, ops] - times[jobs, ops])  # longest remaining time after this operation
+
+
+def _mopnr(jobs, ops, times, remaining, est):
+    return ops - times.shape[1]  # most operations remaining
+
+
+def _fifo(jobs, ops, times, remaining, est):
+    return est  # earliest possible start first
+
+
+RULES = {
+    'spt': _spt,
+    'lpt': _lpt,
+    'mwkr': _mwkr,
+    'lrpt': _lrpt,
+    'mopnr': _mopnr,
+    'fifo': _fifo,
+}
+
+
+def giffler_thompson(times, machines, rule='mwkr', rng=None):
+    """Build an active schedule with the Giffler-Thompson algorithm.
+
+    rule is a name from RULES or a callable with the same signature. With an
+    rng (numpy Generator) ties and near-ties are broken at random, which is
+    what the restarts in dispatch_best use. Returns a Schedule with solver
+    'dispatch:<rule>'.
+    """
+    begin = time.perf_counter()
+    times = np.asarray(times, dtype=np.int64)
+    machines = np.asarray(machines, dtype=np.int64)
+    n, m = times.shape
+    priority = RULES[rule] if isinstance(rule, str) else rule
+    remaining = times[:, ::-1].cumsum(axis=1)[:, ::-1]
+
+    jobs = np.arange(n)
+    next_op = np.zeros(n, dtype=np.int64)
+    job_ready = np.zeros(n, dtype=np.int64)
+    machine_ready = np.zeros(m, dtype=np.int64)
+    start = np.zeros((n, m), dtype=np.int64)
+    big = np.iinfo(np.int64).max
+
+    for _ in range(n * m):
+        active = next_op < m
+        ops = np.minimum(next_op, m - 1)
+        mach = machines[jobs, ops]
+        est = np.maximum(job_ready, machine_ready[mach])
+        ect = np.where(active, est + times[jobs, ops], big)
+
+        # The operation that can finish first fixes the machine; every job waiting for
+        # that machine that could start before then is in conflict with it
+        j_star = int(np.argmin(ect))
+        m_star = mach[j_star]
+        candidates = np.nonzero(active & (mach == m_star) & (est < ect[j_star]))[0]
+        keys = np.asarray(priority(candidates, ops[candidates], times, remaining, est[candidates]), dtype=float)
+        if rng is not None:
+            keys = keys + rng.random(len(candidates)) * 1e-3 * (np.abs(keys).max() + 1)
+        j = int(candidates[np.argmin(keys)])
+
+        k = next_op[j]
+        start[j, k] = est[j]
+        job_ready[j] = machine_ready[m_star] = est[j] + times[j, k]
+        next_op[j] += 1
+
+    name = rule if isinstance(rule, str) else getattr(rule, '__name__', 'custom')
+    return Schedule(start, times, machines, solver='dispatch:' + name, runtime=time.perf_counter() - begin)
+
+
+def dispatch_best(times, machines, rules=tuple(RULES), restarts=0, seed=0):
+    """Run every rule once (plus randomized restarts) and keep the best schedule.
+
+    Returns the best Schedule found (its solver names the rule), with the
+    time of all runs as its runtime.
+    """
+    begin = time.perf_counter()
+    best = None
+    for rule in rules:
+        schedule = giffler_thompson(times, machines, rule)
+        if best is None or schedule.makespan < best.makespan:
+            best = schedule
+    rng = np.random.default_rng(seed)
+    for r in range(restarts):
+        schedule = giffler_thompson(times, machines, rules[r % len(rules)], rng=rng)
+        if schedule.makespan < best.makespan:
+            best = schedule
+    best.runtime = time.perf_counter() - begin
+    return best
+
+
+if __name__ == "__main__":
+    import os
+
+    from jssp_benchmark import BEST_KNOWN, DATA_DIR
+    from jssp_instance import load_instance
+
+    for name in sorted(BEST_KNOWN):
+        instance = load_instance(os.path.join(DATA_DIR, name + '.txt'))
+        schedule = dispatch_best(instance.times, instance.machines, restarts=50)
+        print("{}: makespan {} ({}), best known {}, {:.1f} ms".format(
+            name, schedule.makespan, schedule.solver, BEST_KNOWN[name], schedule.runtime * 1000))
@@ -0,0 +1,355 @@
+import glob
+import hashlib
+import json
+import os
+
+import numpy as np
+
+# Cached instances live next to this module unless the caller picks another folder
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.jssp_cache')
+
+
+class JobShopInstance:
+    """A job shop instance stored as two int32 (n, m) arrays.
+
+    machines[j, k] is the machine of the k-th operation of job j (0-based) and
+    times[j, k] is its processing time.
+    """
+
+    __slots__ = ('name', 'machines', 'times', 'metadata')
+
+    def __init__(self, machines, times, name=None, metadata=None):
+        machines = np.asarray(machines, dtype=np.int32)
+        times = np.asarray(times, dtype=np.int32)
+        if machines.ndim != 2 or machines.shape != times.shape:
+            raise ValueError("machines and times must be (n, m) arrays of the same shape")
+        n, m = machines.shape
+        if n and ((machines < 0).any() or (machines >= m).any()):
+            raise ValueError("Machine ids must lie in [0, {})".format(m))
+        if (times < 0).any():
+            raise ValueError("Processing times must be non-negative")
+        self.name = name
+        self.machines = machines
+        self.times = times
+        self.metadata = dict(metadata) if metadata else {}
+
+    @property
+    def n(self):
+        return self.machines.shape[0]  # jobs
+
+    @property
+    def m(self):
+        return self.machines.shape[1]  # machines (= operations per job)
+
+    def to_lists(self):
+        # The (n, m, times, machines) tuple the HA2 scripts work with
+        return self.n, self.m, self.times.tolist(), self.machines.tolist()
+
+    def digest(self):
+        # Hash of the normalized arrays, independent of file formatting and name
+        h = hashlib.sha1()
+        h.update(np.array([self.n, self.m], dtype='<i4').tobytes())
+        h.update(np.ascontiguousarray(self.machines, dtype='<i4').tobytes())
+        h.update(np.ascontiguousarray(self.times, dtype='<i4').tobytes())
+        return h.hexdigest()
+
+    def __repr__(self):
+        return 'JobShopInstance(name={!r}, n={}, m={})'.format(self.name, self.n, self.m)
+
+
+def parse_job_scheduling_text(text, name=None):
+    # "n m" header followed by n rows of m (machine, time) pairs
+    tokens = text.split()
+    if len(tokens) < 2:
+        raise ValueError("First line should contain two integers representing n and m")
+    try:
+        n, m = int(tokens[0]), int(tokens[1])
+    except ValueError:
+        raise ValueError("First line should contain two integers representing n and m")
+    body = tokens[2:]
+    if len(body) != 2 * n * m:
+        raise ValueError("Expected {} integers for a {}x{} instance, found {}".format(2 * n * m, n, m, len(body)))
+    try:
+        pairs = np.array(body, dtype=np.int32).reshape(n, m, 2)
+    except ValueError:
+        raise ValueError("Job lines must contain integers only")
+    return JobShopInstance(pairs[:, :, 0], pairs[:, :, 1], name=name)
+
+
+def parse_taillard_text(text, name=None):
+    # "Nb of jobs, ..." line, the six header values, then "Times" and "Machines" blocks
+    # of n rows each; Taillard numbers machines from 1
+    lines = text.splitlines()
+    header = lines[1].split()
+    n, m = int(header[0]), int(header[1])
+    tokens = ' '.join(lines[2:]).split()
+    try:
+        times_at = tokens.index('Times') + 1
+        machines_at = tokens.index('Machines') + 1
+    except ValueError:
+        raise ValueError("Taillard instance needs a Times and a Machines block")
+    times = np.array(tokens[times_at:times_at + n * m], dtype=np.int32)
+    machines = np.array(tokens[machines_at:machines_at + n * m], dtype=np.int32)
+    if times.size != n * m or machines.size != n * m:
+        raise ValueError("Truncated Taillard instance {}".format(name))
+    return JobShopInstance(machines.reshape(n, m) - 1, times.reshape(n, m), name=name,
+                           metadata=_taillard_header(header))
+
+
+def _taillard_header(values):
+    # Jobs and machines are followed by the two seeds and the published bounds
+    return dict(zip(('time_seed', 'machine_seed', 'upper_bound', 'lower_bound'), map(int, values[2:6])))
+
+
+def write_job_scheduling_data(instance, file_path):
+    # Write an instance in the same plain format read_job_scheduling_data reads
+    with open(file_path, 'w') as file:
+        file.write(format_job_scheduling_text(instance))
+
+
+def format_job_scheduling_text(instance):
+    width = len(str(max(int(instance.times.max(initial=0)), instance.m)))
+    lines = [' {} {}'.format(instance.n, instance.m)]
+    for j in range(instance.n):
+        lines.append(' '.join('{:>{w}} {:>{w}}'.format(mc, t, w=width)
+                              for mc, t in zip(instance.machines[j].tolist(), instance.times[j].tolist())))
+    return '\n'.join(lines) + '\n'
+
+
+def _cache_path(cache_dir, key):
+    return os.path.join(cache_dir, key + '.npy')
+
+
+def _load_cached(cache_dir, key, name):
+    path = _cache_path(cache_dir, key)
+    if not os.path.exists(path):
+        return None
+    try:
+        data = np.load(path, mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+    if data.ndim != 3 or data.shape[0] != 2 or data.dtype != np.int32:
+        return None
+    instance = JobShopInstance.__new__(JobShopInstance)
+    instance.name = name
+    instance.machines = data[0]
+    instance.times = data[1]
+    instance.metadata = {}
+    return instance
+
+
+def _store_cached(cache_dir, key, instance):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _cache_path(cache_dir, key)
+    # Write to a temporary file first so concurrent readers never see half a file
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp_path, 'wb') as file:
+        np.save(file, np.stack([instance.machines, instance.times]).astype(np.int32))
+    os.replace(tmp_path, path)
+
+
+def load_instance(file_path, cache_dir=DEFAULT_CACHE_DIR, name=None):
+    """Load a single-instance OR-Library file as a JobShopInstance.
+
+    The parsed arrays are cached as <sha1 of the file>.npy in cache_dir and
+    memory-mapped on later loads; pass cache_dir=None to always parse.
+    """
+    with open(file_path, 'rb') as file:
+        raw = file.read()
+    if not raw.strip():
+        raise ValueError("File is empty")
+    if name is None:
+        name = os.path.splitext(os.path.basename(file_path))[0]
+
+    key = hashlib.sha1(raw).hexdigest()
+    if cache_dir is not None:
+        instance = _load_cached(cache_dir, key, name)
+        if instance is not None:
+            return instance
+
+    instance = parse_job_scheduling_text(raw.decode('latin-1'), name=name)
+    if cache_dir is not None:
+        try:
+            _store_cached(cache_dir, key, instance)
+        except OSError:
+            pass  # a read-only cache folder should not stop us from solving
+    return instance
+
+
+# Bundle indexes are kept per process as well, so a batch run never re-reads them
+_index_memo = {}
+
+
+def _lines_with_offsets(file):
+    offset = 0
+    for line in file:
+        yield offset, line
+        offset += len(line)
+
+
+def _is_int_pair(words):
+    return len(words) == 2 and all(w.isdigit() for w in words)
+
+
+def _next_line(it, file_path):
+    try:
+        return next(it)
+    except StopIteration:
+        raise ValueError("Truncated instance at the end of {}".format(file_path))
+
+
+def _scan_bundle(file_path):
+    # Walk the file once and record where every instance starts and ends
+    entries = []
+    with open(file_path, 'rb') as file:
+        it = _lines_with_offsets(file)
+        pending_name = None
+        description = None
+        for offset, line in it:
+            words = line.split()
+            if not words or line.lstrip().startswith(b'+'):
+                continue
+            if line.lstrip().lower().startswith(b'nb of jobs'):
+                # Taillard block: header values, "Times" + n rows, "Machines" + n rows
+                end, row = _next_line(it, file_path)
+                n = int(row.split()[0])
+                rows = 0
+                for end, row in it:
+                    if row.split() and not row.strip().isalpha():
+                        rows += 1
+                    if rows == 2 * n:
+                        break
+                entries.append({'name': pending_name, 'format': 'taillard', 'offset': offset,
+                                'length': end + len(row) - offset, 'description': description})
+                pending_name = description = None
+            elif words[0].lower() == b'instance' and len(words) >= 2:
+                pending_name = words[1].decode('latin-1')
+                description = None
+            elif _is_int_pair(words):
+                # OR-Library block: "n m" header followed by n job rows
+                n = int(words[0])
+                end, row = offset, line
+                rows = 0
+                while rows < n:
+                    end, row = _next_line(it, file_path)
+                    if row.split():
+                        rows += 1
+                entries.append({'name': pending_name, 'format': 'orlib', 'offset': offset,
+                                'length': end + len(row) - offset, 'description': description})
+                pending_name = description = None
+            else:
+                description = line.strip().decode('latin-1')
+
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    for k, entry in enumerate(entries):
+        if entry['name'] is None:
+            entry['name'] = stem if len(entries) == 1 else '{}_{}'.format(stem, k + 1)
+    return entries
+
+
+def index_bundle(file_path, cache_dir=DEFAULT_CACHE_DIR):
+    """Return the instance entries (name, format, byte offset, length) of a file.
+
+    The index is stored in cache_dir and reused as long as the file's size and
+    modification time are unchanged, so each file is scanned only once.
+    """
+    file_path = os.path.abspath(file_path)
+    stat = os.stat(file_path)
+    stamp = [stat.st_size, stat.st_mtime_ns]
+    memo = _index_memo.get(file_path)
+    if memo is not None and memo[0] == stamp:
+        return memo[1]
+
+    index_path = None
+    if cache_dir is not None:
+        index_path = os.path.join(cache_dir, 'index-{}.json'.format(hashlib.sha1(file_path.encode()).hexdigest()))
+        try:
+            with open(index_path) as file:
+                stored = json.load(file)
+            if stored['stamp'] == stamp:
+                _index_memo[file_path] = (stamp, stored['entries'])
+                return stored['entries']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    entries = _scan_bundle(file_path)
+    _index_memo[file_path] = (stamp, entries)
+    if index_path is not None:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = '{}.{}.tmp'.format(index_path, os.getpid())
+            with open(tmp_path, 'w') as file:
+                json.dump({'path': file_path, 'stamp': stamp, 'entries': entries}, file)
+            os.replace(tmp_path, index_path)
+        except OSError:
+            pass
+    return entries
+
+
+def _read_entry(file, file_path, entry, cache_dir):
+    file.seek(entry['offset'])
+    raw = file.read(entry['length'])
+    metadata = {'source': file_path, 'format': entry['format'], 'offset': entry['offset']}
+    if entry.get('description'):
+        metadata['description'] = entry['description']
+
+    key = hashlib.sha1(raw).hexdigest()
+    instance = _load_cached(cache_dir, key, entry['name']) if cache_dir is not None else None
+    if instance is None:
+        text = raw.decode('latin-1')
+        if entry['format'] == 'taillard':
+            instance = parse_taillard_text(text, name=entry['name'])
+        else:
+            instance = parse_job_scheduling_text(text, name=entry['name'])
+        if cache_dir is not None:
+            try:
+                _store_cached(cache_dir, key, instance)
+            except OSError:
+                pass
+    if entry['format'] == 'taillard':
+        # Seeds and bounds come from the header line, which the array cache does not keep
+        metadata.update(_taillard_header(raw.splitlines()[1].split()))
+    instance.metadata = metadata
+    return instance
+
+
+def _expand_source(source, pattern):
+    if os.path.isdir(source):
+        return sorted(glob.glob(os.path.join(source, pattern)))
+    if glob.has_magic(source):
+        return sorted(glob.glob(source))
+    return [source]
+
+
+def list_instances(source, pattern='*.txt', cache_dir=DEFAULT_CACHE_DIR):
+    # (file path, position in the file, instance name) for every instance in a file, directory or glob;
+    # the position tells apart instances of the same name (see read_instance)
+    return [(file_path, k, entry['name'])
+            for file_path in _expand_source(source, pattern)
+            for k, entry in enumerate(index_bundle(file_path, cache_dir))]
+
+
+def read_instance(file_path, index, cache_dir=DEFAULT_CACHE_DIR):
+    # The index-th instance of a file, as numbered by list_instances
+    entry = index_bundle(file_path, cache_dir)[index]
+    with open(file_path, 'rb') as file:
+        return _read_entry(file, file_path, entry, cache_dir)
+
+
+def iter_instances(source, pattern='*.txt', cache_dir=DEFAULT_CACHE_DIR, names=None):
+    """Lazily yield every JobShopInstance in a file, a directory or a glob.
+
+    A file may hold one instance or a whole suite (OR-Library jobshop1 bundle,
+    Taillard set). Only one instance is held in memory at a time; names
+    restricts the output to the given instance names.
+    """
+    wanted = set(names) if names is not None else None
+    for file_path in _expand_source(source, pattern):
+        entries = index_bundle(file_path, cache_dir)
+        if wanted is not None:
+            entries = [entry for entry in entries if entry['name'] in wanted]
+        if not entries:
+            continue
+        with open(file_path, 'rb') as file:
+            for entry in entries:
+                yield _read_entry(file, file_path, entry, cache_dir)
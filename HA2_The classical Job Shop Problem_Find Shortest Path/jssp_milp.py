@@ -0,0 +1,771 @@
+import math
+import time
+
+import gurobipy as gp
+import numpy as np
+from gurobipy import GRB
+
+from jssp_bounds import lower_bounds, operation_heads_tails
+from jssp_cache import cached
+from jssp_heuristics import dispatch_best
+from jssp_precheck import (COMPLETION_NAME, NO_OVERLAP_NAME, PRECEDENCE_NAME, ConflictError,
+                            explain_infeasibility, find_conflict)
+from jssp_schedule import Schedule, machine_sequences, semi_active_schedule
+
+# How the machine disjunctions are modelled:
+#   'compact'   one binary per unordered job pair and machine, big-M per machine
+#   'indicator' one binary per unordered job pair and machine, indicator constraints
+#   'full'      the original model, one binary per ordered pair and a global big-M
+DISJUNCTIVE_MODES = ('compact', 'indicator', 'full')
+
+# Which model solve_job_scheduling builds:
+#   'disjunctive'  start times plus one order binary per job pair (Manne), see DISJUNCTIVE_MODES
+#   'time_indexed' one binary per operation and possible start time, strong LP but grows with the horizon
+#   'rank'         one binary per job and position on every machine (Wagner)
+#   'auto'         time-indexed for short horizons with many jobs, disjunctive otherwise
+FORMULATIONS = ('disjunctive', 'time_indexed', 'rank', 'auto')
+
+# 'auto' picks the time-indexed model when its n * m * horizon binaries are at most
+# TIME_INDEXED_RATIO times the n * (n - 1) / 2 * m order binaries, and no more than TIME_INDEXED_LIMIT
+TIME_INDEXED_RATIO = 6
+TIME_INDEXED_LIMIT = 50000
+
+# Options that only the disjunctive model understands
+_DISJUNCTIVE_OPTIONS = ('disjunctive', 'vectorized', 'preprocess')
+
+
+def machine_times(n, m, times, machines):
+    # times are listed in operation order, the model indexes start times by machine
+    p = [[0] * m for _ in range(n)]
+    for j in range(n):
+        for k in range(m):
+            p[j][machines[j][k]] = times[j][k]
+    return p
+
+
+def machine_heads_tails(n, m, times, machines):
+    # head[j][i]: work of job j before its operation on machine i, tail[j][i]: work after it
+    head = [[0] * m for _ in range(n)]
+    tail = [[0] * m for _ in range(n)]
+    for j in range(n):
+        total = sum(times[j])
+        done = 0
+        for k in range(m):
+            head[j][machines[j][k]] = done
+            done += times[j][k]
+            tail[j][machines[j][k]] = total - done
+    return head, tail
+
+
+def machine_big_m(n, m, times, machines, horizon):
+    # In any schedule finishing by the horizon, job j ends on machine i by horizon - tail
+    # and job k starts there after its head, so this M covers every pair on machine i
+    head, tail = machine_heads_tails(n, m, times, machines)
+    return [horizon - min(tail[j][i] for j in range(n)) - min(head[k][i] for k in range(n))
+            for i in range(m)]
+
+
+def time_windows(n, m, times, machines, horizon, lags=None):
+    """Earliest and latest start of every job on every machine.
+
+    est[j][i] is the head of job j's operation on machine i; lst[j][i] is the
+    latest start that still lets the job finish its tail by the horizon, so
+    every schedule with makespan <= horizon starts each operation inside its
+    window.
+    """
+    head, tail = operation_heads_tails(times, lags)
+    rows = np.arange(n)[:, None]
+    machines = np.asarray(machines, dtype=np.int64)
+    est = np.zeros((n, m), dtype=np.int64)
+    lst = np.zeros((n, m), dtype=np.int64)
+    est[rows, machines] = head
+    lst[rows, machines] = horizon - tail - np.asarray(times, dtype=np.int64)
+    if (lst < est).any():
+        conflict = find_conflict(n, m, times, machines, lags=lags, horizon=horizon)
+        if conflict is not None:
+            raise ConflictError(conflict)
+        raise ValueError("No schedule finishes by the horizon {}".format(horizon))
+    return est, lst
+
+
+def _name(names, pattern, *args):
+    return pattern.format(*args) if names else ''
+
+
+def _names(names, pattern, *columns):
+    # One name per row of the index arrays, for the matrix API; None skips naming
+    return [pattern.format(*row) for row in zip(*(np.asarray(a).tolist() for a in columns))] if names else None
+
+
+# Function to build the disjunctive (Manne) model of the job scheduling problem
+def build_job_scheduling_model(n, m, times, machines, time_limit=20 * 60, disjunctive='compact', horizon=None,
+                               lags=None, vectorized=False, names=True, preprocess=True):
+    """Build the disjunctive job shop model without solving it.
+
+    lags[j][k] is an extra delay (e.g. travel time) between operations k and
+    k+1 of job j. vectorized=True adds variables and constraints in bulk with
+    the matrix API; names=False skips the per-variable name strings.
+    preprocess=True bounds every start time by its time window (see
+    time_windows), uses a big-M per job pair and leaves out the binaries of
+    pairs whose order the windows already fix; the tighter the horizon, the
+    more it removes. The 'full' model is always built as it was.
+    """
+    if disjunctive not in DISJUNCTIVE_MODES:
+        raise ValueError("disjunctive must be one of {}".format(DISJUNCTIVE_MODES))
+    if lags is None:
+        lags = [[0] * (m - 1) for _ in range(n)]
+
+    # Any upper bound on the makespan works as horizon; the serial schedule is always one
+    if horizon is None:
+        horizon = sum(times[i][j] for i in range(n) for j in range(m)) + sum(sum(row) for row in lags)
+    if vectorized:
+        return _build_job_scheduling_matrix_model(n, m, times, machines, time_limit, disjunctive, horizon,
+                                                  lags, names, preprocess)
+
+    start = time.perf_counter()
+    p = machine_times(n, m, times, machines)
+    preprocess = preprocess and disjunctive != 'full'
+    if preprocess:
+        est, lst = (w.tolist() for w in time_windows(n, m, times, machines, horizon, lags))
+    else:
+        est = [[0] * m for _ in range(n)]
+        lst = [[GRB.INFINITY] * m for _ in range(n)]
+
+    # Create the Gurobi model
+    model = gp.Model('JSSP')
+    model.Params.TimeLimit = time_limit
+
+    # Define decision variables; x(j,i) is the start of job j on machine i
+    c = model.addVar(name="C", vtype=GRB.INTEGER, ub=horizon)
+    x = [[model.addVar(name=_name(names, 'x({},{})', j+1, i+1), vtype=GRB.INTEGER, lb=est[j][i], ub=lst[j][i])
+          for i in range(m)] for j in range(n)]
+
+    # Set the objective function to minimize completion time (C)
+    model.setObjective(c, GRB.MINIMIZE)
+
+    # Add constraints
+    # Constraints for task sequencing on machines
+    for j in range(n):
+        for i in range(1, m):
+            machine_start = x[j][machines[j][i]]
+            machine_end = x[j][machines[j][i-1]]
+            model.addConstr(machine_start - machine_end >= times[j][i-1] + lags[j][i-1],
+                            name=_name(names, PRECEDENCE_NAME, j, machines[j][i-1], machines[j][i]))
+
+    # Constraints for task sequencing between jobs; y(j,k,i) = 1 means j goes before k on i
+    fixed = 0
+    if disjunctive == 'full':
+        M = horizon
+        y = [[[model.addVar(name=_name(names, 'y({},{},{})', j+1, k+1, i+1), vtype=GRB.BINARY)
+               for i in range(m)] for k in range(n)] for j in range(n)]
+        for j in range(n):
+            for k in range(n):
+                if k != j:
+                    for i in range(m):
+                        model.addConstr(x[j][i] - x[k][i] + M*y[j][k][i] >= p[k][i],
+                                        name=_name(names, NO_OVERLAP_NAME, k, j, i))
+                        model.addConstr(-x[j][i] + x[k][i] - M*y[j][k][i] >= p[j][i] - M,
+                                        name=_name(names, NO_OVERLAP_NAME, j, k, i))
+    else:
+        # y(j,k,i) and y(k,j,i) are the same decision, so only j < k gets a binary
+        M = machine_big_m(n, m, times, machines, horizon)
+        y = {}
+        for i in range(m):
+            for j in range(n):
+                for k in range(j + 1, n):
+                    if preprocess:
+                        j_first = est[j][i] + p[j][i] <= lst[k][i]
+                        k_first = est[k][i] + p[k][i] <= lst[j][i]
+                        if not (j_first and k_first):
+                            # Only one order fits in the time windows, so it needs no binary
+                            if j_first:
+                                model.addConstr(x[k][i] - x[j][i] >= p[j][i],
+                                                name=_name(names, NO_OVERLAP_NAME, j, k, i))
+                            elif k_first:
+                                model.addConstr(x[j][i] - x[k][i] >= p[k][i],
+                                                name=_name(names, NO_OVERLAP_NAME, k, j, i))
+                            else:
+                                raise ValueError("No schedule finishes by the horizon {}".format(horizon))
+                            fixed += 1
+                            continue
+                        # Largest violation either constraint can see inside the windows
+                        M_jk = lst[j][i] + p[j][i] - est[k][i]
+                        M_kj = lst[k][i] + p[k][i] - est[j][i]
+                    else:
+                        M_jk = M_kj = M[i]
+                    y[j, k, i] = model.addVar(name=_name(names, 'y({},{},{})', j+1, k+1, i+1), vtype=GRB.BINARY)
+                    if disjunctive == 'indicator':
+                        model.addGenConstrIndicator(y[j, k, i], True, x[k][i] - x[j][i] >= p[j][i],
+                                                    name=_name(names, NO_OVERLAP_NAME, j, k, i))
+                        model.addGenConstrIndicator(y[j, k, i], False, x[j][i] - x[k][i] >= p[k][i],
+                                                    name=_name(names, NO_OVERLAP_NAME, k, j, i))
+                    else:
+                        model.addConstr(x[k][i] - x[j][i] - M_jk*y[j, k, i] >= p[j][i] - M_jk,
+                                        name=_name(names, NO_OVERLAP_NAME, j, k, i))
+                        model.addConstr(x[j][i] - x[k][i] + M_kj*y[j, k, i] >= p[k][i],
+                                        name=_name(names, NO_OVERLAP_NAME, k, j, i))
+
+    # Constraints for job completion time
+    for j in range(n):
+        last_machine = x[j][machines[j][m - 1]]
+        model.addConstr(c - last_machine >= times[j][m - 1], name=_name(names, COMPLETION_NAME, j))
+
+    model.update()
+    model._build_time = time.perf_counter() - start
+    model._c, model._x, model._y = c, x, y
+    model._fixed_pairs = fixed
+    return model
+
+
+def _pair_indices(n, m):
+    # (j, k, machine) for every j < k on every machine, in the order the loop model uses
+    J, K = np.triu_indices(n, 1)
+    return np.tile(J, m), np.tile(K, m), np.repeat(np.arange(m), len(J))
+
+
+def _build_job_scheduling_matrix_model(n, m, times, machines, time_limit, disjunctive, horizon, lags, names,
+                                       preprocess):
+    start = time.perf_counter()
+    T = np.asarray(times, dtype=float)
+    machines = np.asarray(machines, dtype=np.int64)
+    jobs = np.arange(n)
+    p = np.zeros((n, m))
+    p[jobs[:, None], machines] = T
+    preprocess = preprocess and disjunctive != 'full'
+    if preprocess:
+        est, lst = time_windows(n, m, T, machines, horizon, lags)
+    else:
+        est, lst = 0.0, GRB.INFINITY
+
+    model = gp.Model('JSSP')
+    model.Params.TimeLimit = time_limit
+
+    # x[j, i] is the start of job j on machine i, as in the loop model
+    x_names = np.array([['x({},{})'.format(j+1, i+1) for i in range(m)] for j in range(n)]) if names else None
+    c = model.addVar(name="C", vtype=GRB.INTEGER, ub=horizon)
+    x = model.addMVar((n, m), vtype=GRB.INTEGER, lb=est, ub=lst, name=x_names)
+    model.setObjective(c, GRB.MINIMIZE)
+    model._fixed_pairs = 0
+
+    # Job precedences: operation k+1 starts after operation k (plus its lag) ends
+    rows = np.repeat(jobs, m - 1)
+    model.addConstr(x[rows, machines[:, 1:].ravel()] - x[rows, machines[:, :-1].ravel()]
+                    >= T[:, :-1].ravel() + np.asarray(lags, dtype=float).reshape(-1),
+                    name=_names(names, PRECEDENCE_NAME, rows, machines[:, :-1].ravel(), machines[:, 1:].ravel()))
+
+    if disjunctive == 'full':
+        J, K = np.nonzero(~np.eye(n, dtype=bool))
+        J, K, I = np.tile(J, m), np.tile(K, m), np.repeat(np.arange(m), len(J))
+        y_names = np.array([[['y({},{},{})'.format(j+1, k+1, i+1) for i in range(m)] for k in range(n)]
+                            for j in range(n)]) if names else None
+        y_all = model.addMVar((n, n, m), vtype=GRB.BINARY, name=y_names)
+        yv = y_all[J, K, I]
+        model.addConstr(x[J, I] - x[K, I] + horizon * yv >= p[K, I], name=_names(names, NO_OVERLAP_NAME, K, J, I))
+        model.addConstr(x[K, I] - x[J, I] - horizon * yv >= p[J, I] - horizon,
+                        name=_names(names, NO_OVERLAP_NAME, J, K, I))
+        y = y_all.tolist()
+    else:
+        J, K, I = _pair_indices(n, m)
+        M = np.asarray(machine_big_m(n, m, T.tolist(), machines.tolist(), horizon), dtype=float)[I]
+        M_jk = M_kj = M
+        if preprocess:
+            # Pairs with only one order inside the time windows get a plain precedence
+            j_first = est[J, I] + p[J, I] <= lst[K, I]
+            k_first = est[K, I] + p[K, I] <= lst[J, I]
+            if not (j_first | k_first).all():
+                raise ValueError("No schedule finishes by the horizon {}".format(horizon))
+            for first, second, only in ((J, K, ~k_first), (K, J, ~j_first)):
+                if only.any():
+                    a, b, i = first[only], second[only], I[only]
+                    model.addConstr(x[b, i] - x[a, i] >= p[a, i], name=_names(names, NO_OVERLAP_NAME, a, b, i))
+            free = j_first & k_first
+            model._fixed_pairs = int((~free).sum())
+            J, K, I = J[free], K[free], I[free]
+            M_jk = lst[J, I] + p[J, I] - est[K, I]
+            M_kj = lst[K, I] + p[K, I] - est[J, I]
+        y_names = ['y({},{},{})'.format(j+1, k+1, i+1) for j, k, i in zip(J, K, I)] if names else None
+        yv = model.addMVar(len(J), vtype=GRB.BINARY, name=y_names)
+        if disjunctive == 'indicator':
+            first = model.addGenConstrIndicator(yv, True, x[K, I] - x[J, I] >= p[J, I])
+            second = model.addGenConstrIndicator(yv, False, x[J, I] - x[K, I] >= p[K, I])
+            if names and len(J):
+                # Matrix indicators take no names when added
+                model.update()
+                model.setAttr('GenConstrName', first.tolist(), _names(names, NO_OVERLAP_NAME, J, K, I))
+                model.setAttr('GenConstrName', second.tolist(), _names(names, NO_OVERLAP_NAME, K, J, I))
+        else:
+            model.addConstr(x[K, I] - x[J, I] - M_jk * yv >= p[J, I] - M_jk,
+                            name=_names(names, NO_OVERLAP_NAME, J, K, I))
+            model.addConstr(x[J, I] - x[K, I] + M_kj * yv >= p[K, I],
+                            name=_names(names, NO_OVERLAP_NAME, K, J, I))
+        y = dict(zip(zip(J.tolist(), K.tolist(), I.tolist()), yv.tolist()))
+
+    # Job completion times
+    model.addConstr(c - x[jobs, machines[:, -1]] >= T[:, -1], name=_names(names, COMPLETION_NAME, jobs))
+
+    model.update()
+    model._build_time = time.perf_counter() - start
+    model._c, model._x, model._y = c, x.tolist(), y
+    model._x_matrix = x
+    return model
+
+
+def heuristic_horizon(n, m, times, machines, lags=None):
+    # Makespan of the best dispatching-rule schedule, an upper bound found in milliseconds
+    start = consistent_start(n, m, times, machines, dispatch_best(times, machines).start, lags)
+    return int((start + np.asarray(times)).max())
+
+
+def _job_routes(model, n, m, times, machines, lags, x, c):
+    # Job precedences and the makespan, shared by the time-indexed and rank models
+    for j in range(n):
+        for k in range(1, m):
+            model.addConstr(x[j][machines[j][k]] - x[j][machines[j][k-1]] >= times[j][k-1] + lags[j][k-1],
+                            name=PRECEDENCE_NAME.format(j, machines[j][k-1], machines[j][k]))
+        model.addConstr(c - x[j][machines[j][m - 1]] >= times[j][m - 1], name=COMPLETION_NAME.format(j))
+
+
+def build_time_indexed_model(n, m, times, machines, time_limit=20 * 60, horizon=None, lags=None, names=True):
+    """Time-indexed model: z(j,i,t) = 1 when job j starts on machine i at time t.
+
+    Only start times inside the time windows for the horizon get a binary,
+    so a tight horizon keeps the model small. x(j,i) = sum of t * z(j,i,t)
+    is kept as a variable, so the model exposes the same _x and _c as the
+    disjunctive one.
+    """
+    if lags is None:
+        lags = [[0] * (m - 1) for _ in range(n)]
+    if horizon is None:
+        horizon = heuristic_horizon(n, m, times, machines, lags)
+    start = time.perf_counter()
+    p = machine_times(n, m, times, machines)
+    est, lst = (w.tolist() for w in time_windows(n, m, times, machines, horizon, lags))
+
+    model = gp.Model('JSSP')
+    model.Params.TimeLimit = time_limit
+    c = model.addVar(name="C", vtype=GRB.INTEGER, ub=horizon)
+    x = [[model.addVar(name=_name(names, 'x({},{})', j+1, i+1), vtype=GRB.INTEGER, lb=est[j][i], ub=lst[j][i])
+          for i in range(m)] for j in range(n)]
+    model.setObjective(c, GRB.MINIMIZE)
+
+    z = {}
+    busy = [[[] for _ in range(horizon)] for _ in range(m)]  # busy[i][t]: starts that occupy machine i at t
+    for j in range(n):
+        for i in range(m):
+            starts = range(est[j][i], lst[j][i] + 1)
+            for t in starts:
+                z[j, i, t] = model.addVar(name=_name(names, 'z({},{},{})', j+1, i+1, t), vtype=GRB.BINARY)
+                for u in range(t, t + p[j][i]):
+                    busy[i][u].append(z[j, i, t])
+            model.addConstr(gp.quicksum(z[j, i, t] for t in starts) == 1)
+            model.addConstr(gp.quicksum(t * z[j, i, t] for t in starts) == x[j][i])
+
+    # At most one operation in progress on a machine at any time
+    for i in range(m):
+        for t in range(horizon):
+            if len(busy[i][t]) > 1:
+                model.addConstr(gp.quicksum(busy[i][t]) <= 1)
+
+    _job_routes(model, n, m, times, machines, lags, x, c)
+
+    model.update()
+    model._build_time = time.perf_counter() - start
+    model._c, model._x, model._y, model._z = c, x, {}, z
+    model._formulation = 'time_indexed'
+    return model
+
+
+def build_rank_model(n, m, times, machines, time_limit=20 * 60, horizon=None, lags=None, names=True):
+    """Rank-based (Wagner) model: r(j,i,k) = 1 when job j is the k-th job on machine i.
+
+    h(i,k) is the start of the k-th position on machine i; the positions are
+    chained on every machine and tied to the start times x(j,i) with big-M
+    constraints taken from the time windows.
+    """
+    if lags is None:
+        lags = [[0] * (m - 1) for _ in range(n)]
+    if horizon is None:
+        horizon = heuristic_horizon(n, m, times, machines, lags)
+    start = time.perf_counter()
+    p = machine_times(n, m, times, machines)
+    est, lst = (w.tolist() for w in time_windows(n, m, times, machines, horizon, lags))
+
+    model = gp.Model('JSSP')
+    model.Params.TimeLimit = time_limit
+    c = model.addVar(name="C", vtype=GRB.INTEGER, ub=horizon)
+    x = [[model.addVar(name=_name(names, 'x({},{})', j+1, i+1), vtype=GRB.INTEGER, lb=est[j][i], ub=lst[j][i])
+          for i in range(m)] for j in range(n)]
+    model.setObjective(c, GRB.MINIMIZE)
+
+    r = {(j, i, k): model.addVar(name=_name(names, 'r({},{},{})', j+1, i+1, k+1), vtype=GRB.BINARY)
+         for j in range(n) for i in range(m) for k in range(n)}
+    h_lb = [min(est[j][i] for j in range(n)) for i in range(m)]
+    h_ub = [max(lst[j][i] for j in range(n)) for i in range(m)]
+    h = [[model.addVar(name=_name(names, 'h({},{})', i+1, k+1), vtype=GRB.INTEGER, lb=h_lb[i], ub=h_ub[i])
+          for k in range(n)] for i in range(m)]
+
+    for i in range(m):
+        for j in range(n):
+            model.addConstr(gp.quicksum(r[j, i, k] for k in range(n)) == 1)
+        for k in range(n):
+            model.addConstr(gp.quicksum(r[j, i, k] for j in range(n)) == 1)
+        # The next position starts after the job in this one has finished
+        for k in range(n - 1):
+            model.addConstr(h[i][k+1] - h[i][k] - gp.quicksum(p[j][i] * r[j, i, k] for j in range(n)) >= 0)
+        # x(j,i) = h(i,k) whenever job j holds position k
+        for j in range(n):
+            for k in range(n):
+                model.addConstr(x[j][i] - h[i][k] <= (lst[j][i] - h_lb[i]) * (1 - r[j, i, k]))
+                model.addConstr(h[i][k] - x[j][i] <= (h_ub[i] - est[j][i]) * (1 - r[j, i, k]))
+
+    _job_routes(model, n, m, times, machines, lags, x, c)
+
+    model.update()
+    model._build_time = time.perf_counter() - start
+    model._c, model._x, model._y, model._rank, model._h = c, x, {}, r, h
+    model._formulation = 'rank'
+    return model
+
+
+def choose_formulation(n, m, horizon):
+    # The time-indexed LP is much tighter, but it has a binary for every start time; on
+    # small instances it only won when the horizon was short compared to the number of jobs
+    grid = n * m * horizon
+    if grid <= TIME_INDEXED_LIMIT and grid <= TIME_INDEXED_RATIO * n * (n - 1) // 2 * m:
+        return 'time_indexed'
+    return 'disjunctive'
+
+
+def build_model(n, m, times, machines, formulation='disjunctive', **options):
+    """Build the model of the given formulation (see FORMULATIONS).
+
+    'auto' needs a horizon and takes the dispatching-rule makespan when none
+    is given. Options the chosen model does not use (the disjunctive ones
+    for the other formulations) are ignored.
+    """
+    if formulation not in FORMULATIONS:
+        raise ValueError("formulation must be one of {}".format(FORMULATIONS))
+    if formulation == 'auto':
+        if options.get('horizon') is None:
+            options['horizon'] = heuristic_horizon(n, m, times, machines, options.get('lags'))
+        formulation = choose_formulation(n, m, options['horizon'])
+    if formulation == 'disjunctive':
+        model = build_job_scheduling_model(n, m, times, machines, **options)
+        model._formulation = 'disjunctive'
+        return model
+    for option in _DISJUNCTIVE_OPTIONS:
+        options.pop(option, None)
+    builder = build_time_indexed_model if formulation == 'time_indexed' else build_rank_model
+    return builder(n, m, times, machines, **options)
+
+
+def consistent_start(n, m, times, machines, initial_start, lags=None):
+    # Keep only the machine orders of the given schedule and rebuild the earliest
+    # start times from them, so every constraint of the model holds for the MIP start
+    start = semi_active_schedule(times, machines, machine_sequences(initial_start, machines), lags)
+    if start is None:
+        raise ValueError("The initial schedule orders some machines in a cycle")
+    return start
+
+
+def set_initial_schedule(model, n, m, times, machines, start):
+    """Give a built model consistent Start values for all its variables.
+
+    start[j][k] is the start of the k-th operation of job j and must already
+    satisfy the model (see consistent_start).
+    """
+    start = np.asarray(start)
+    machines = np.asarray(machines)
+    x_start = np.zeros((n, m))
+    x_start[np.arange(n)[:, None], machines] = start
+
+    variables = [model._c]
+    values = [float((start + np.asarray(times)).max())]
+    for j in range(n):
+        variables.extend(model._x[j])
+        values.extend(x_start[j].tolist())
+
+    # y(j,k,i) = 1 when job j comes before job k on machine i
+    if isinstance(model._y, dict):
+        for (j, k, i), var in model._y.items():
+            variables.append(var)
+            values.append(1.0 if x_start[j, i] < x_start[k, i] else 0.0)
+    else:
+        for j in range(n):
+            for k in range(n):
+                if k != j:
+                    for i in range(m):
+                        variables.append(model._y[j][k][i])
+                        values.append(1.0 if x_start[j, i] < x_start[k, i] else 0.0)
+
+    # The other formulations: the start time slot, or the position on each machine
+    formulation = getattr(model, '_formulation', 'disjunctive')
+    if formulation == 'time_indexed':
+        for (j, i, t), var in model._z.items():
+            variables.append(var)
+            values.append(1.0 if x_start[j, i] == t else 0.0)
+    elif formulation == 'rank':
+        sequences = machine_sequences(start, machines)
+        for i, sequence in enumerate(sequences):
+            for k, j in enumerate(sequence):
+                variables.append(model._h[i][k])
+                values.append(float(x_start[j, i]))
+        for (j, i, k), var in model._rank.items():
+            variables.append(var)
+            values.append(1.0 if sequences[i][k] == j else 0.0)
+    model.setAttr('Start', variables, values)
+    return values[0]
+
+
+def stop_at_lower_bound(lower_bound, callback=None):
+    # Callback that ends the solve once the incumbent reaches a proven lower bound,
+    # instead of letting Gurobi close the gap on its own
+    def stop(model, where):
+        if callback is not None:
+            callback(model, where)
+        if where == GRB.Callback.MIPSOL:
+            if model.cbGet(GRB.Callback.MIPSOL_OBJ) <= lower_bound + 0.5:
+                model.terminate()
+        elif where == GRB.Callback.MIP:
+            if model.cbGet(GRB.Callback.MIP_OBJBST) <= lower_bound + 0.5:
+                model.terminate()
+    return stop
+
+
+def proven_optimal(model):
+    # Optimal by Gurobi's own proof, or stopped with the incumbent on the lower bound
+    if model.status == GRB.OPTIMAL:
+        return True
+    lower_bound = getattr(model, '_lower_bound', None)
+    return model.SolCount > 0 and lower_bound is not None and model.ObjVal <= lower_bound + 0.5
+
+
+# Function to solve the job scheduling problem
+@cached('milp')
+def solve_job_scheduling(n, m, times, machines, time_limit=20 * 60, callback=None, initial_start=None,
+                         use_bounds=True, formulation='disjunctive', **options):
+    """Build and solve the model of the chosen formulation (see FORMULATIONS).
+
+    initial_start (start[j][k] by operation, e.g. from a heuristic or an
+    earlier solve) becomes the MIP start, and its makespan the horizon unless
+    one is given. Without either, the preprocessed model gets the best
+    dispatching-rule makespan as its horizon. With use_bounds the instance
+    lower bounds are computed first, kept in model._bounds /
+    model._lower_bound, and the solve stops as soon as the incumbent meets
+    them (see proven_optimal). Other options go to build_model, except
+    cache: a jssp_cache.ScheduleCache that answers proven optima without
+    solving and warm-starts from its other entries.
+
+    Returns the best Schedule found (with the model in schedule.model), or
+    None if the solver found no solution. An infeasible model raises
+    jssp_precheck.ConflictError (a ValueError, with the Conflict in
+    .conflict): without calling the solver when find_conflict shows it (a
+    chain longer than the horizon, or fixed orders in a cycle), otherwise
+    with Gurobi's IIS, whose constraints carry the same names.
+    """
+    bounds = lower_bounds(times, machines, options.get('lags')) if use_bounds else None
+    start = None
+    if initial_start is not None:
+        start = consistent_start(n, m, times, machines, initial_start, options.get('lags'))
+        options.setdefault('horizon', int((start + np.asarray(times)).max()))
+    elif options.get('horizon') is None and (options.get('preprocess', True) or formulation != 'disjunctive'):
+        # Time windows are only as tight as the horizon; a dispatching rule gives a good one in milliseconds
+        options['horizon'] = heuristic_horizon(n, m, times, machines, options.get('lags'))
+    model = build_model(n, m, times, machines, formulation, time_limit=time_limit, **options)
+    return _optimize(model, n, m, times, machines, options.get('lags'), start, bounds, callback)
+
+
+def fixed_orders(model):
+    # Machine orders (j, k, i) the model fixes through the bounds of its binaries
+    if isinstance(model._y, dict):
+        keys, variables = list(model._y.keys()), list(model._y.values())
+    else:
+        keys = [(j, k, i) for j, row in enumerate(model._y) for k, pair in enumerate(row) if k != j
+                for i in range(len(pair))]
+        variables = [model._y[j][k][i] for j, k, i in keys]
+    if not variables:
+        return []
+    orders = []
+    for (j, k, i), lb, ub in zip(keys, model.getAttr('LB', variables), model.getAttr('UB', variables)):
+        if lb > 0.5:
+            orders.append((j, k, i))
+        elif ub < 0.5:
+            orders.append((k, j, i))  # y = 0 puts job k first
+    return orders
+
+
+def _optimize(model, n, m, times, machines, lags, start, bounds, callback):
+    # MIP start, bound-based early stop and the Schedule, shared by every solve path
+    # The precedence graph proves most infeasible models in milliseconds, so Gurobi never sees them
+    model.update()
+    horizon = int(model._c.UB) if model._c.UB < GRB.INFINITY else None
+    conflict = find_conflict(n, m, times, machines, fixed_orders(model), lags=lags, horizon=horizon)
+    if conflict is not None:
+        model._conflict = conflict
+        raise ConflictError(conflict)
+    if start is not None:
+        set_initial_schedule(model, n, m, times, machines, start)
+    model._bounds = bounds
+    model._lower_bound = bounds['best'] if bounds else None
+    if bounds:
+        callback = stop_at_lower_bound(bounds['best'], callback)
+
+    # Optimize the model
+    model.optimize(callback)
+
+    if model.status == GRB.INFEASIBLE:
+        # The graph check above found nothing, so this is Gurobi's IIS, in the same constraint names
+        model._conflict = explain_infeasibility(model, n, m, times, machines, lags=lags, horizon=horizon)
+        raise ConflictError(model._conflict)
+    if model.SolCount == 0:
+        return None
+    # Stopped at the lower bound before the root relaxation, Gurobi has no bound of its own (-inf)
+    bound = math.ceil(model.ObjBound - 1e-6) if math.isfinite(model.ObjBound) else None
+    if model._lower_bound is not None:
+        bound = model._lower_bound if bound is None else max(bound, model._lower_bound)
+    return Schedule.from_model(model, times, machines, lags, bound=bound,
+                               optimal=proven_optimal(model), solver='milp:' + model._formulation,
+                               runtime=model.Runtime)
+
+
+class ModelTemplate:
+    """Compact disjunctive model for every instance with n jobs and m machines.
+
+    The rows and columns are built once. load() writes an instance into them
+    (precedence coefficients for its routing, per-pair big-M values,
+    right-hand sides and time-window bounds) and solve() re-optimizes, so a
+    suite of same-shape instances pays for one build. Pairs whose order the
+    windows fix get their binary fixed through its bounds instead of being
+    left out, so the structure stays the same for every instance.
+    """
+
+    def __init__(self, n, m, time_limit=20 * 60, names=True):
+        begin = time.perf_counter()
+        self.n, self.m = n, m
+        model = gp.Model('JSSP')
+        model.Params.TimeLimit = time_limit
+        c = model.addVar(name="C", vtype=GRB.INTEGER)
+        x = [[model.addVar(name=_name(names, 'x({},{})', j+1, i+1), vtype=GRB.INTEGER) for i in range(m)]
+             for j in range(n)]
+        model.setObjective(c, GRB.MINIMIZE)
+
+        # Row (j, k-1) orders operations k-1 and k of job j; its coefficients follow the routing
+        self._precedence = [model.addLConstr(gp.LinExpr(), GRB.GREATER_EQUAL, 0)
+                            for j in range(n) for k in range(1, m)]
+        self._completion = [model.addLConstr(c, GRB.GREATER_EQUAL, 0, name=_name(names, COMPLETION_NAME, j))
+                            for j in range(n)]
+        self._names = names
+
+        # Both big-M rows of every pair j < k on every machine; M goes in per instance
+        self._pairs = _pair_indices(n, m)
+        y = {}
+        self._rows_jk, self._rows_kj = [], []
+        for j, k, i in zip(*(a.tolist() for a in self._pairs)):
+            y[j, k, i] = model.addVar(name=_name(names, 'y({},{},{})', j+1, k+1, i+1), vtype=GRB.BINARY)
+            self._rows_jk.append(model.addLConstr(x[k][i] - x[j][i], GRB.GREATER_EQUAL, 0,
+                                                  name=_name(names, NO_OVERLAP_NAME, j, k, i)))
+            self._rows_kj.append(model.addLConstr(x[j][i] - x[k][i], GRB.GREATER_EQUAL, 0,
+                                                  name=_name(names, NO_OVERLAP_NAME, k, j, i)))
+        self._y = list(y.values())
+        self._x = [var for row in x for var in row]
+        self._routing = None
+
+        model.update()
+        model._c, model._x, model._y = c, x, y
+        model._formulation = 'disjunctive'
+        model._template = self
+        self.model = model
+        self.build_time = time.perf_counter() - begin
+
+    def load(self, times, machines, lags=None, horizon=None):
+        """Write an instance into the model and return the model, ready to optimize."""
+        begin = time.perf_counter()
+        n, m, model = self.n, self.m, self.model
+        if np.shape(times) != (n, m) or np.shape(machines) != (n, m):
+            raise ValueError("The template is for {}x{} instances".format(n, m))
+        machines = np.asarray(machines, dtype=np.int64).tolist()
+        if lags is None:
+            lags = [[0] * (m - 1) for _ in range(n)]
+        if horizon is None:
+            horizon = heuristic_horizon(n, m, times, machines, lags)
+        x = model._x
+
+        # Move the precedence and completion coefficients over to the new routing
+        if machines != self._routing:
+            old = self._routing
+            for j in range(n):
+                for k in range(1, m):
+                    row = self._precedence[j * (m - 1) + k - 1]
+                    if old is not None:
+                        model.chgCoeff(row, x[j][old[j][k]], 0.0)
+                        model.chgCoeff(row, x[j][old[j][k-1]], 0.0)
+                    model.chgCoeff(row, x[j][machines[j][k]], 1.0)
+                    model.chgCoeff(row, x[j][machines[j][k-1]], -1.0)
+                if old is not None:
+                    model.chgCoeff(self._completion[j], x[j][old[j][m-1]], 0.0)
+                model.chgCoeff(self._completion[j], x[j][machines[j][m-1]], -1.0)
+            if self._names:
+                # Precedence rows are named after the machines of the routing they hold
+                model.setAttr('ConstrName', self._precedence,
+                              [PRECEDENCE_NAME.format(j, machines[j][k-1], machines[j][k])
+                               for j in range(n) for k in range(1, m)])
+            self._routing = machines
+        model.setAttr('RHS', self._precedence,
+                      [times[j][k-1] + lags[j][k-1] for j in range(n) for k in range(1, m)])
+        model.setAttr('RHS', self._completion, [times[j][m-1] for j in range(n)])
+
+        # Time windows become bounds, and give the big-M of every pair
+        est, lst = time_windows(n, m, times, machines, horizon, lags)
+        model._c.UB = horizon
+        model.setAttr('LB', self._x, est.ravel().tolist())
+        model.setAttr('UB', self._x, lst.ravel().tolist())
+        p = np.asarray(machine_times(n, m, times, machines), dtype=float)
+        J, K, I = self._pairs
+        j_first = est[J, I] + p[J, I] <= lst[K, I]
+        k_first = est[K, I] + p[K, I] <= lst[J, I]
+        if not (j_first | k_first).all():
+            raise ValueError("No schedule finishes by the horizon {}".format(horizon))
+        M_jk = (lst[J, I] + p[J, I] - est[K, I]).tolist()
+        M_kj = (lst[K, I] + p[K, I] - est[J, I]).tolist()
+        for r, var in enumerate(self._y):
+            model.chgCoeff(self._rows_jk[r], var, -M_jk[r])
+            model.chgCoeff(self._rows_kj[r], var, M_kj[r])
+        model.setAttr('RHS', self._rows_jk, (p[J, I] - M_jk).tolist())
+        model.setAttr('RHS', self._rows_kj, p[K, I].tolist())
+        model.setAttr('LB', self._y, (j_first & ~k_first).astype(float).tolist())
+        model.setAttr('UB', self._y, j_first.astype(float).tolist())
+        model._fixed_pairs = int((j_first != k_first).sum())
+
+        # Forget the previous instance's solution before the next solve
+        model.reset()
+        model.update()
+        model._build_time = time.perf_counter() - begin
+        return model
+
+    def solve(self, times, machines, lags=None, callback=None, initial_start=None, use_bounds=True, horizon=None):
+        # Same as solve_job_scheduling for an instance of the template's shape
+        n, m = self.n, self.m
+        bounds = lower_bounds(times, machines, lags) if use_bounds else None
+        start = None
+        if initial_start is not None:
+            start = consistent_start(n, m, times, machines, initial_start, lags)
+            if horizon is None:
+                horizon = int((start + np.asarray(times)).max())
+        model = self.load(times, machines, lags, horizon)
+        return _optimize(model, n, m, times, machines, lags, start, bounds, callback)
+
+
+# Templates kept by template_model, one per (n, m) and process
+_templates = {}
+
+
+def template_model(n, m, times, machines, time_limit=20 * 60):
+    """Model for the instance from this process's template of its shape, built on first use."""
+    built = (n, m) not in _templates
+    if built:
+        _templates[n, m] = ModelTemplate(n, m, time_limit=time_limit, names=False)
+    model = _templates[n, m].load(times, machines)
+    if built:
+        model._build_time += _templates[n, m].build_time  # the first instance pays for the build
+    model.Params.TimeLimit = time_limit
+    return model
\ No newline at end of file
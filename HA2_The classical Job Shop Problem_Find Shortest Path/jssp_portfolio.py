@@ -0,0 +1,242 @@
+import math
+import multiprocessing
+import os
+import queue
+import time
+
+import numpy as np
+
+from jssp_bounds import lower_bounds
+from jssp_cache import cached
+from jssp_schedule import Schedule
+
+ENGINES = ('milp', 'cp', 'tabu', 'shifting_bottleneck', 'z3')
+DEFAULT_ENGINES = ('milp', 'cp', 'tabu', 'shifting_bottleneck')
+
+# Largest makespan a shared 64-bit value can hold; stands for "no schedule yet"
+_NONE = 2 ** 62
+
+
+class SharedBounds:
+    """Best schedule and lower bound shared by the processes of one portfolio run.
+
+    Engines offer() every schedule they find and prove() every lower bound;
+    poll() gives an engine back (makespan, start, lower) to tighten its own
+    search. Every change is also sent to the parent over events, so it can
+    follow the race without taking the lock.
+    """
+
+    def __init__(self, n, m, context):
+        self.n, self.m = n, m
+        self._lock = context.Lock()
+        self._makespan = context.Value('q', _NONE, lock=False)
+        self._lower = context.Value('q', 0, lock=False)
+        self._start = context.Array('q', n * m, lock=False)
+        self.events = context.Queue()
+        self.stop = context.Event()
+
+    def offer(self, engine, elapsed, makespan, start):
+        makespan = int(round(makespan))  # MIPSOL_OBJ may be 929.9999999
+        with self._lock:
+            if makespan >= self._makespan.value:
+                return False
+            self._makespan.value = makespan
+            self._start[:] = np.asarray(start, dtype=np.int64).ravel().tolist()
+        self.events.put(('solution', engine, elapsed, makespan, np.asarray(start, dtype=np.int64).tolist()))
+        return True
+
+    def prove(self, engine, elapsed, lower):
+        lower = int(lower)
+        with self._lock:
+            if lower <= self._lower.value:
+                return False
+            self._lower.value = lower
+        self.events.put(('bound', engine, elapsed, lower, None))
+        return True
+
+    def poll(self):
+        with self._lock:
+            makespan, lower = self._makespan.value, self._lower.value
+            start = list(self._start) if makespan < _NONE else None
+        if start is None:
+            return None, None, lower
+        m = self.m
+        return makespan, [start[j * m:(j + 1) * m] for j in range(self.n)], lower
+
+    def finished(self, engine, elapsed, schedule=None, error=None):
+        if schedule is None:
+            self.events.put(('finished', engine, elapsed, None, error))
+        else:
+            self.events.put(('finished', engine, elapsed, schedule.makespan,
+                             (schedule.optimal, schedule.bound, schedule.start.tolist())))
+
+
+def _milp_callback(shared, n, m, machines, begin):
+    # Share MILP incumbents and bounds, take in better schedules from the other engines and
+    # stop once the shared bounds meet
+    from gurobipy import GRB
+
+    def callback(model, where):
+        if where == GRB.Callback.MIPSOL:
+            x = model.cbGetSolution([v for row in model._x for v in row])
+            start = [[round(x[j * m + machines[j][k]]) for k in range(m)] for j in range(n)]
+            shared.offer('milp', time.perf_counter() - begin, model.cbGet(GRB.Callback.MIPSOL_OBJ), start)
+        elif where == GRB.Callback.MIP:
+            best = model.cbGet(GRB.Callback.MIP_OBJBST)
+            bound = model.cbGet(GRB.Callback.MIP_OBJBND)
+            if bound < 1e99:
+                shared.prove('milp', time.perf_counter() - begin, math.ceil(bound - 1e-6))
+            makespan, _, lower = shared.poll()
+            if shared.stop.is_set() or (makespan is not None and lower >= makespan):
+                model.terminate()
+            elif best < 1e99 and lower >= best - 0.5:
+                model.terminate()
+        elif where == GRB.Callback.MIPNODE and model.cbGet(GRB.Callback.MIPNODE_STATUS) == GRB.OPTIMAL:
+            makespan, start, _ = shared.poll()
+            if makespan is not None and makespan < model.cbGet(GRB.Callback.MIPNODE_OBJBST) - 0.5:
+                # Only the start times; Gurobi completes the ordering variables itself
+                x = np.zeros((n, m))
+                x[np.arange(n)[:, None], np.asarray(machines)] = start
+                model.cbSetSolution([v for row in model._x for v in row], x.ravel().tolist())
+                model.cbSetSolution(model._c, float(makespan))
+                model.cbUseSolution()
+    return callback
+
+
+def _run_engine(engine, n, m, times, machines, time_limit, shared, threads):
+    # One engine of the race; runs in its own process
+    begin = time.perf_counter()
+
+    def on_solution(elapsed, makespan, start):
+        shared.offer(engine, time.perf_counter() - begin, makespan, start)
+
+    def on_bound(elapsed, lower):
+        shared.prove(engine, time.perf_counter() - begin, lower)
+
+    try:
+        if engine == 'milp':
+            import gurobipy as gp
+
+            from jssp_milp import solve_job_scheduling
+
+            gp.setParam('OutputFlag', 0)
+            gp.setParam('Threads', threads)
+            schedule = solve_job_scheduling(n, m, times, machines, time_limit=time_limit,
+                                            callback=_milp_callback(shared, n, m, machines, begin))
+        elif engine == 'cp':
+            from jssp_cp import solve_job_scheduling_cp
+            schedule = solve_job_scheduling_cp(n, m, times, machines, time_limit=time_limit, callback=on_solution,
+                                               on_bound=on_bound, poll=shared.poll)
+        elif engine == 'tabu':
+            from jssp_tabu import tabu_search
+            schedule = tabu_search(n, m, times, machines, time_limit=time_limit, on_improvement=on_solution,
+                                   lower_bound=lower_bounds(times, machines)['best'])
+        elif engine == 'shifting_bottleneck':
+            from jssp_shifting import shifting_bottleneck
+            schedule = shifting_bottleneck(n, m, times, machines, time_limit=time_limit)
+            on_solution(schedule.runtime, schedule.makespan, schedule.start)
+        else:
+            from jssp_z3 import solve_job_scheduling_z3
+            schedule = solve_job_scheduling_z3(n, m, times, machines, time_limit=time_limit, callback=on_solution,
+                                               on_bound=on_bound, poll=shared.poll)
+    except Exception as exc:  # license limits, missing packages, ...
+        shared.finished(engine, time.perf_counter() - begin, error='{}: {}'.format(type(exc).__name__, exc))
+        return
+    if schedule is not None and schedule.optimal:
+        shared.prove(engine, time.perf_counter() - begin, schedule.makespan)
+    shared.finished(engine, time.perf_counter() - begin, schedule)
+
+
+@cached('portfolio')
+def run_portfolio(n, m, times, machines, engines=DEFAULT_ENGINES, time_limit=20 * 60, callback=None,
+                  on_bound=None, grace=0.5):
+    """Race several engines (see ENGINES) on one instance, each in its own process.
+
+    The engines share their schedules and lower bounds through a
+    SharedBounds: the MILP takes in better schedules as heuristic solutions
+    and stops on the shared bound, CP and z3 tighten their searches with
+    them. The race ends as soon as one engine proves optimality or the
+    shared bounds meet, every engine has finished, or time_limit passes;
+    engines still running then get grace seconds and are terminated.
+    callback(elapsed, makespan, start) and on_bound(elapsed, lower) report
+    the shared incumbent and bound as they improve.
+
+    Returns a Schedule (solver = 'portfolio:<engine that found it>', model
+    = {engine: (makespan or None, error or None)}), or None if no engine
+    found a schedule.
+    """
+    unknown = set(engines) - set(ENGINES)
+    if unknown:
+        raise ValueError("unknown engines {}, choose from {}".format(sorted(unknown), ENGINES))
+    begin = time.perf_counter()
+    lower = lower_bounds(times, machines)['best']
+    times = np.asarray(times).tolist()
+    machines = np.asarray(machines).tolist()
+
+    context = multiprocessing.get_context('spawn')
+    shared = SharedBounds(n, m, context)
+    shared.prove('bounds', 0.0, lower)
+    # Gurobi gets the cores the other engines leave free
+    threads = max(1, (os.cpu_count() or 1) - len(engines) + 1)
+    processes = {engine: context.Process(target=_run_engine, daemon=True,
+                                         args=(engine, n, m, times, machines, time_limit, shared, threads))
+                 for engine in engines}
+    for process in processes.values():
+        process.start()
+
+    best = best_start = winner = None
+    results = {}
+    optimal = False
+    while len(results) < len(engines) and not optimal:
+        remaining = time_limit - (time.perf_counter() - begin)
+        if remaining <= 0:
+            break
+        try:
+            kind, engine, _, value, data = shared.events.get(timeout=min(remaining, 0.1))
+        except queue.Empty:
+            # A process killed from outside (out of memory, ...) never reports back
+            for engine, process in processes.items():
+                if engine not in results and not process.is_alive():
+                    results[engine] = (None, 'exited with code {}'.format(process.exitcode))
+            continue
+        elapsed = time.perf_counter() - begin
+        if kind == 'solution' and (best is None or value < best):
+            best, best_start, winner = value, data, engine
+            if callback is not None:
+                callback(elapsed, best, best_start)
+        elif kind == 'bound' and value > lower:
+            lower = value
+            if on_bound is not None:
+                on_bound(elapsed, lower)
+        elif kind == 'finished':
+            results[engine] = (value, None) if value is not None else (None, data)
+            if value is not None and (best is None or value < best):
+                best, best_start, winner = value, data[2], engine
+            if value is not None and data[0]:
+                lower = max(lower, value)
+        optimal = best is not None and lower >= best
+
+    shared.stop.set()
+    deadline = time.perf_counter() + grace
+    for engine, process in processes.items():
+        process.join(max(0.0, deadline - time.perf_counter()))
+        if process.is_alive():
+            process.terminate()
+            process.join()
+        results.setdefault(engine, (None, 'stopped'))
+
+    if best is None:
+        return None
+    return Schedule(best_start, times, machines, bound=best if optimal else lower, optimal=optimal,
+                    solver='portfolio:' + winner, runtime=time.perf_counter() - begin, model=results)
+
+
+if __name__ == "__main__":
+    from jssp_benchmark import BEST_KNOWN, DATA_DIR
+    from jssp_instance import load_instance
+
+    for name in sorted(BEST_KNOWN):
+        n, m, times, machines = load_instance(os.path.join(DATA_DIR, name + '.txt')).to_lists()
+        schedule = run_portfolio(n, m, times, machines, time_limit=120)
+        print("{}: makespan {} (best known {}), optimal {}, from {} in {:.2f}s".format(
+            name, schedule.makespan, BEST_KNOWN[name], schedule.optimal, schedule.solver, schedule.runtime))
@@ -0,0 +1,221 @@
+import math
+
+# Constraint names shared with the MILP models (jssp_milp), so an IIS reads like a Conflict
+PRECEDENCE_NAME = 'precedence_job{}_machine{}_to_machine{}'  # job, machine, next machine
+NO_OVERLAP_NAME = 'no_overlap_job{}_job{}_on_machine{}'  # first job, second job, machine
+COMPLETION_NAME = 'completion_job{}'
+
+
+class Conflict:
+    """A set of constraints that cannot hold together.
+
+    kind is 'cycle' (the precedences and fixed orders go round in a circle
+    of positive length), 'horizon' or 'deadline' (a chain of them is longer
+    than the limit) or 'iis' (Gurobi's irreducible infeasible subsystem,
+    when the graph has no explanation). constraints are named like the
+    constraints of the MILP models in jssp_milp and of infeasible_model.ilp:
+    precedence_job{j}_machine{a}_to_machine{b},
+    no_overlap_job{j}_job{k}_on_machine{i}, horizon and deadline_job{j};
+    no_overlap_on_machine{i} stands for all pairs on machine i.
+    """
+
+    __slots__ = ('kind', 'constraints', 'length', 'limit')
+
+    def __init__(self, kind, constraints, length=None, limit=None):
+        self.kind = kind
+        self.constraints = list(constraints)
+        self.length = length
+        self.limit = limit
+
+    def __str__(self):
+        if self.kind == 'cycle':
+            head = "Cycle of length {} in the precedences".format(self.length)
+        elif self.kind == 'iis':
+            head = "Irreducible infeasible subsystem"
+        else:
+            head = "Chain of length {} exceeds the {} {}".format(self.length, self.kind, self.limit)
+        return '{}: {}'.format(head, ', '.join(self.constraints))
+
+    def __repr__(self):
+        return 'Conflict({!r}, {} constraints)'.format(self.kind, len(self.constraints))
+
+
+class ConflictError(ValueError):
+    """Raised for a model that cannot be feasible; the Conflict that shows it is in .conflict."""
+
+    def __init__(self, conflict):
+        super().__init__(str(conflict))
+        self.conflict = conflict
+
+
+def precedence_graph(n, m, times, machines, orders=(), lags=None):
+    """Edges (a, b, length, name) between operations o = j*m + k: start[b] >= start[a] + length.
+
+    The job routes (with lags rounded up as in the MILP) and every fixed
+    order (j, k, i), job j before job k on machine i, as in y(j,k,i) = 1.
+    """
+    edges = []
+    for j in range(n):
+        for k in range(m - 1):
+            lag = math.ceil(lags[j][k]) if lags is not None else 0
+            edges.append((j * m + k, j * m + k + 1, int(times[j][k]) + lag,
+                          PRECEDENCE_NAME.format(j, machines[j][k], machines[j][k + 1])))
+    position = [{int(i): k for k, i in enumerate(row)} for row in machines]
+    for j, k, i in orders:
+        a, b = j * m + position[j][i], k * m + position[k][i]
+        edges.append((a, b, int(times[j][position[j][i]]), NO_OVERLAP_NAME.format(j, k, i)))
+    return edges
+
+
+def _topological(size, edges):
+    # Kahn's algorithm; returns the order (shorter than size when there is a cycle) and the out-edges
+    out = [[] for _ in range(size)]
+    indegree = [0] * size
+    for edge in edges:
+        out[edge[0]].append(edge)
+        indegree[edge[1]] += 1
+    ready = [o for o in range(size) if indegree[o] == 0]
+    order = []
+    while ready:
+        o = ready.pop()
+        order.append(o)
+        for edge in out[o]:
+            indegree[edge[1]] -= 1
+            if indegree[edge[1]] == 0:
+                ready.append(edge[1])
+    return order, out, indegree
+
+
+def _cycle(size, edges, indegree):
+    # Every operation left with indegree > 0 after Kahn has a predecessor that is also left;
+    # walking predecessors from any of them must close a cycle
+    incoming = {}
+    for edge in edges:
+        if indegree[edge[0]] > 0 and indegree[edge[1]] > 0:
+            incoming.setdefault(edge[1], edge)
+    o = next(o for o in range(size) if indegree[o] > 0)
+    seen = {}
+    path = []
+    while o not in seen:
+        seen[o] = len(path)
+        edge = incoming[o]
+        path.append(edge)
+        o = edge[0]
+    cycle = path[seen[o]:]
+    cycle.reverse()
+    return cycle
+
+
+def _positive_cycle(size, edges):
+    # Bellman-Ford for longest paths; a relaxation in round size means a positive cycle
+    dist = [0] * size
+    pred = [None] * size
+    for _ in range(size):
+        last = None
+        for edge in edges:
+            a, b, length = edge[0], edge[1], edge[2]
+            if dist[a] + length > dist[b]:
+                dist[b] = dist[a] + length
+                pred[b] = edge
+                last = b
+        if last is None:
+            return None
+    o = last
+    for _ in range(size):
+        o = pred[o][0]  # size steps back is surely on the cycle
+    cycle = []
+    edge = pred[o]
+    while True:
+        cycle.append(edge)
+        if edge[0] == o:
+            break
+        edge = pred[edge[0]]
+    cycle.reverse()
+    return cycle
+
+
+def _path(o, link):
+    # Follow link (pred or succ edges) from o until it runs out
+    path = []
+    while link[o] is not None:
+        path.append(link[o])
+        o = link[o][0] if link[o][1] == o else link[o][1]
+    return path
+
+
+def find_conflict(n, m, times, machines, orders=(), lags=None, horizon=None, deadlines=None):
+    """Explain an infeasible job shop variant from its precedence graph alone.
+
+    orders are fixed machine orders (j, k, i): job j before job k on machine
+    i. Looks for a cycle of positive length through the job routes and the
+    orders, then for a chain of them longer than horizon (makespan) or than
+    deadlines[j] (completion of job j), and for a machine whose work does
+    not fit between its heads, its tails and the horizon. Runs in
+    O(operations + orders) unless a cycle of zero length needs
+    Bellman-Ford. Returns a Conflict or
+    None; None does not prove feasibility, since machines without fixed
+    orders are not checked.
+    """
+    size = n * m
+    p = [int(t) for row in times for t in row]
+    edges = precedence_graph(n, m, times, machines, orders, lags)
+    order, out, indegree = _topological(size, edges)
+    if len(order) < size:
+        cycle = _cycle(size, edges, indegree)
+        if sum(edge[2] for edge in cycle) <= 0:
+            cycle = _positive_cycle(size, edges)  # rare: zero-length operations on the first cycle
+            if cycle is None:
+                return None
+        return Conflict('cycle', [edge[3] for edge in cycle], sum(edge[2] for edge in cycle))
+    if horizon is None and deadlines is None:
+        return None
+
+    # Heads (longest path to the start) and tails (longest path from the end to the sink)
+    head, tail = [0] * size, [0] * size
+    pred, succ = [None] * size, [None] * size
+    for o in order:
+        for edge in out[o]:
+            if head[o] + edge[2] > head[edge[1]]:
+                head[edge[1]] = head[o] + edge[2]
+                pred[edge[1]] = edge
+    for o in reversed(order):
+        for edge in out[o]:
+            b = edge[1]
+            if edge[2] - p[o] + p[b] + tail[b] > tail[o]:
+                tail[o] = edge[2] - p[o] + p[b] + tail[b]
+                succ[o] = edge
+
+    if deadlines is not None:
+        for j, deadline in enumerate(deadlines):
+            o = j * m + m - 1
+            if deadline is not None and head[o] + p[o] > deadline:
+                chain = [edge[3] for edge in reversed(_path(o, pred))]
+                return Conflict('deadline', chain + ['deadline_job{}'.format(j)], head[o] + p[o], deadline)
+    if horizon is not None:
+        o = max(range(size), key=lambda o: head[o] + p[o] + tail[o])
+        if head[o] + p[o] + tail[o] > horizon:
+            chain = [edge[3] for edge in reversed(_path(o, pred))] + [edge[3] for edge in _path(o, succ)]
+            return Conflict('horizon', chain + ['horizon'], head[o] + p[o] + tail[o], horizon)
+        # A machine cannot start before its smallest head or finish its work later than its smallest tail allows
+        for i in range(m):
+            ops = [j * m + k for j in range(n) for k in range(m) if machines[j][k] == i]
+            length = min(head[o] for o in ops) + sum(p[o] for o in ops) + min(tail[o] for o in ops)
+            if length > horizon:
+                return Conflict('horizon', ['no_overlap_on_machine{}'.format(i), 'horizon'], length, horizon)
+    return None
+
+
+def explain_infeasibility(model, n, m, times, machines, orders=(), lags=None, horizon=None, deadlines=None):
+    """find_conflict first; only if it has no answer, Gurobi's IIS of the (infeasible) model.
+
+    Returns a Conflict, with kind 'iis' and the names of the IIS
+    constraints in the second case.
+    """
+    conflict = find_conflict(n, m, times, machines, orders, lags, horizon, deadlines)
+    if conflict is not None:
+        return conflict
+    model.computeIIS()
+    constraints = [c.ConstrName for c in model.getConstrs() if c.IISConstr]
+    constraints += [c.ConstrName for c in model.getGenConstrs() if c.IISGenConstr]
+    constraints += ['{} bounds'.format(v.VarName) for v in model.getVars() if v.IISLB or v.IISUB]
+    return Conflict('iis', constraints)
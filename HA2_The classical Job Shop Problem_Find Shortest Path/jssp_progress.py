@@ -0,0 +1,117 @@
+import json
+from collections import deque
+
+from gurobipy import GRB
+
+# Gurobi reports "no incumbent yet" as an infinite objective
+_NO_VALUE = 1e99
+
+
+def _value(x):
+    return None if x is None or abs(x) >= _NO_VALUE else x
+
+
+def _gap(incumbent, bound):
+    if incumbent is None or bound is None:
+        return None
+    return abs(incumbent - bound) / max(abs(incumbent), 1e-10)
+
+
+class ProgressRecorder:
+    """Solver callback that records the incumbent and bound trajectory.
+
+    Every new incumbent (MIPSOL) and every change of incumbent or bound seen
+    at a MIP event becomes a record {time, event, incumbent, bound, nodes,
+    gap}. The last capacity records are kept in memory, and all of them are
+    appended to the JSONL file at path if one is given. callback is called
+    first, so the recorder can wrap another callback (or be wrapped by
+    stop_at_lower_bound).
+    """
+
+    def __init__(self, path=None, capacity=10000, callback=None):
+        self.records = deque(maxlen=capacity)
+        self.path = path
+        self.callback = callback
+        self._file = None
+        self._last = None
+
+    def __call__(self, model, where):
+        if self.callback is not None:
+            self.callback(model, where)
+        if where == GRB.Callback.MIPSOL:
+            self.add(model.cbGet(GRB.Callback.RUNTIME), 'mipsol', model.cbGet(GRB.Callback.MIPSOL_OBJ),
+                     model.cbGet(GRB.Callback.MIPSOL_OBJBND), model.cbGet(GRB.Callback.MIPSOL_NODCNT))
+        elif where == GRB.Callback.MIP:
+            incumbent = _value(model.cbGet(GRB.Callback.MIP_OBJBST))
+            bound = _value(model.cbGet(GRB.Callback.MIP_OBJBND))
+            if self._last != (incumbent, bound):
+                self.add(model.cbGet(GRB.Callback.RUNTIME), 'mip', incumbent, bound,
+                         model.cbGet(GRB.Callback.MIP_NODCNT))
+
+    def add(self, elapsed, event, incumbent, bound, nodes):
+        incumbent, bound = _value(incumbent), _value(bound)
+        record = {'time': round(elapsed, 6), 'event': event, 'incumbent': incumbent, 'bound': bound,
+                  'nodes': int(nodes), 'gap': _gap(incumbent, bound)}
+        self._last = (incumbent, bound)
+        self.records.append(record)
+        if self.path is not None:
+            if self._file is None:
+                self._file = open(self.path, 'a')
+            self._file.write(json.dumps(record) + '\n')
+            self._file.flush()
+        return record
+
+    def finish(self, model):
+        # Final state after optimize(); presolve can solve a model without any MIP event
+        if model.SolCount > 0:
+            self.add(model.Runtime, 'final', model.ObjVal, model.ObjBound, model.NodeCount)
+        self.close()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def summary(self, percents=(10, 5, 1, 0), reference=None):
+        return summarize(list(self.records), percents, reference)
+
+
+def read_progress(file_path):
+    with open(file_path) as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def time_to_first(records):
+    return next((r['time'] for r in records if r['incumbent'] is not None), None)
+
+
+def time_to_within(records, percent, reference=None):
+    """First time the incumbent was within percent % of reference.
+
+    reference defaults to the best incumbent in the records (so percent=0 is
+    the time the final solution was found); pass a best known makespan to
+    measure against that instead.
+    """
+    incumbents = [r['incumbent'] for r in records if r['incumbent'] is not None]
+    if not incumbents:
+        return None
+    if reference is None:
+        reference = min(incumbents)
+    target = reference * (1 + percent / 100) + 1e-9
+    return next((r['time'] for r in records if r['incumbent'] is not None and r['incumbent'] <= target), None)
+
+
+def time_to_gap(records, percent):
+    # First time the solver's own gap was at most percent %
+    return next((r['time'] for r in records if r['gap'] is not None and r['gap'] <= percent / 100 + 1e-9), None)
+
+
+def summarize(records, percents=(10, 5, 1, 0), reference=None):
+    """Times to the first incumbent, to within each percent of reference and to each gap."""
+    incumbents = [r['incumbent'] for r in records if r['incumbent'] is not None]
+    return {
+        'first': time_to_first(records),
+        'best': min(incumbents) if incumbents else None,
+        'within': {p: time_to_within(records, p, reference) for p in percents},
+        'gap': {p: time_to_gap(records, p) for p in percents},
+    }
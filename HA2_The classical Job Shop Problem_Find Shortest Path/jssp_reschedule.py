@@ -0,0 +1,204 @@
+import math
+import time
+
+import numpy as np
+from gurobipy import GRB
+
+from jssp_milp import build_job_scheduling_model, set_initial_schedule
+from jssp_schedule import Schedule, semi_active_schedule
+
+
+class NewJob:
+    """A job that arrives now: times[k] and machines[k] of its operations, lags[k] after operation k."""
+
+    __slots__ = ('times', 'machines', 'lags')
+
+    def __init__(self, times, machines, lags=None):
+        self.times = [int(t) for t in times]
+        self.machines = [int(i) for i in machines]
+        self.lags = lags
+
+
+class MachineDown:
+    """Machine breaks down now and is back at time until; an operation running on it starts over."""
+
+    __slots__ = ('machine', 'until')
+
+    def __init__(self, machine, until):
+        self.machine = machine
+        self.until = until
+
+
+class DurationChange:
+    """Operation k of job j takes duration instead of its planned time (it may already be running)."""
+
+    __slots__ = ('job', 'operation', 'duration')
+
+    def __init__(self, job, operation, duration):
+        self.job = job
+        self.operation = operation
+        self.duration = duration
+
+
+def _apply_event(schedule, now, event, available):
+    # The instance after the event, the operations it frees and the earliest start of each of them
+    start = schedule.start.copy()
+    times = schedule.times.copy()
+    machines = schedule.machines.copy()
+    lags = None if schedule.lags is None else np.asarray(schedule.lags, dtype=float).reshape(schedule.n, -1)
+    started = start < now
+    n, m = times.shape
+
+    if isinstance(event, NewJob):
+        if len(event.times) != m or sorted(event.machines) != list(range(m)):
+            raise ValueError("A new job needs one operation on each of the {} machines".format(m))
+        start = np.vstack([start, np.full((1, m), now, dtype=np.int64)])
+        times = np.vstack([times, event.times])
+        machines = np.vstack([machines, event.machines])
+        started = np.vstack([started, np.zeros((1, m), dtype=bool)])
+        if lags is not None or event.lags is not None:
+            lags = np.vstack([lags if lags is not None else np.zeros((n, m - 1)),
+                              event.lags if event.lags is not None else np.zeros(m - 1)])
+    elif isinstance(event, MachineDown):
+        running = started & (machines == event.machine) & (start + times > now)
+        started &= ~running  # its work is lost, it runs again once the machine is back
+    elif isinstance(event, DurationChange):
+        j, k = event.job, event.operation
+        if started[j, k] and start[j, k] + times[j, k] <= now:
+            raise ValueError("Operation {} of job {} has already finished".format(k, j))
+        times[j, k] = event.duration
+    else:
+        raise ValueError("Unknown event {!r}".format(event))
+
+    # Operations that have not started wait for now and for their machine
+    back = np.zeros(machines.shape[1], dtype=np.int64)
+    for i, until in available.items():
+        back[i] = until
+    if isinstance(event, MachineDown):
+        back[event.machine] = max(back[event.machine], event.until)
+    release = np.where(started, start, np.maximum(now, back[machines]))
+    return start, times, machines, lags, started, release
+
+
+def repair(start, times, machines, started, release, lags=None, last=()):
+    """Keep the machine sequences of start and move every operation that has not started as early as it may.
+
+    Started operations keep their start times; the jobs in last (new jobs,
+    which have no planned order yet) go after all other jobs on every
+    machine, in the order of their index.
+    """
+    n, m = times.shape
+    new = np.isin(np.arange(n), list(last))
+    sequences = []
+    for i in range(m):
+        jobs, ops = np.nonzero(machines == i)
+        # Started operations first in their own order, then the rest in the planned order, new jobs last
+        order = np.lexsort((jobs, start[jobs, ops], new[jobs], ~started[jobs, ops]))
+        sequences.append(jobs[order].tolist())
+    repaired = semi_active_schedule(times, machines, sequences, lags, release)
+    if repaired is None or (repaired[started] != start[started]).any():
+        raise ValueError("The started operations do not fit the new instance")
+    if new.any() and (~new).any():
+        # On each machine a new job may only start once every planned job is done there
+        done = np.zeros(m, dtype=np.int64)
+        np.maximum.at(done, machines[~new].ravel(), (repaired + times)[~new].ravel())
+        if (repaired[new] < done[machines[new]]).any():
+            raise ValueError("A new job was not sequenced after the planned jobs")
+    return repaired
+
+
+def reschedule(schedule, now, event, time_limit=5.0, available=None):
+    """Update a running schedule for an event at time now (NewJob, MachineDown or DurationChange).
+
+    Operations that started before now are frozen with their orders on the
+    machines, except the one a MachineDown interrupts. The remaining plan
+    is first repaired (see repair; a NewJob goes after the planned jobs on
+    every machine), so there is an answer within
+    milliseconds; it then warm-starts the MILP, in which only the
+    operations that have not started are free (no earlier than now, nor
+    than the time their machine is back in available[i] or after the
+    event), and the MILP keeps improving it until time_limit seconds after
+    the call.
+
+    Returns a Schedule (solver 'reschedule:repair' if the MILP did not beat
+    the repaired plan, 'reschedule:milp' otherwise).
+    """
+    begin = time.perf_counter()
+    start, times, machines, lags, started, release = _apply_event(schedule, now, event, available or {})
+    n, m = times.shape
+    repaired = repair(start, times, machines, started, release, lags, last=range(schedule.n, n))
+    makespan = int((repaired + times).max())
+
+    model = build_job_scheduling_model(n, m, times.tolist(), machines.tolist(), time_limit=time_limit,
+                                       horizon=makespan, lags=None if lags is None else lags.tolist(), names=False)
+    x = np.asarray(model._x, dtype=object)[np.arange(n)[:, None], machines]  # x[j, k] by operation
+    for j in range(n):
+        for k in range(m):
+            if started[j, k]:
+                x[j, k].LB = x[j, k].UB = int(start[j, k])
+            else:
+                x[j, k].LB = max(x[j, k].LB, int(release[j, k]))
+    # Orders between two started operations, or a started one and one still waiting, are known
+    position = np.empty((n, m), dtype=np.int64)
+    position[np.arange(n)[:, None], machines] = np.arange(m)
+    for (j, k, i), var in model._y.items():
+        a, b = started[j, position[j, i]], started[k, position[k, i]]
+        if a or b:
+            j_first = a and (not b or start[j, position[j, i]] < start[k, position[k, i]])
+            var.LB = var.UB = 1.0 if j_first else 0.0
+    set_initial_schedule(model, n, m, times, machines, repaired)
+    model.Params.TimeLimit = max(time_limit - (time.perf_counter() - begin), 0.01)
+    model.optimize()
+
+    bound = math.ceil(model.ObjBound - 1e-6) if model.SolCount > 0 else None
+    optimal = model.status == GRB.OPTIMAL
+    if model.SolCount > 0 and model.ObjVal < makespan - 0.5:
+        return Schedule.from_model(model, times, machines, lags, bound=bound, optimal=optimal,
+                                   solver='reschedule:milp', runtime=time.perf_counter() - begin)
+    return Schedule(repaired, times, machines, lags, bound=bound, optimal=optimal, solver='reschedule:repair',
+                    runtime=time.perf_counter() - begin, model=model)
+
+
+class OnlineScheduler:
+    """A schedule kept up to date as events come in, each handled by reschedule within time_limit seconds.
+
+    Remembers until when every machine that broke down is away, so later
+    events do not plan on it.
+    """
+
+    def __init__(self, schedule, time_limit=5.0):
+        self.schedule = schedule
+        self.time_limit = time_limit
+        self.available = {}
+
+    def apply(self, now, event):
+        self.schedule = reschedule(self.schedule, now, event, self.time_limit, self.available)
+        if isinstance(event, MachineDown):
+            self.available[event.machine] = max(self.available.get(event.machine, 0), event.until)
+        return self.schedule
+
+
+if __name__ == "__main__":
+    import os
+
+    import gurobipy as gp
+
+    from jssp_benchmark import DATA_DIR
+    from jssp_instance import load_instance
+    from jssp_milp import solve_job_scheduling
+
+    gp.setParam('OutputFlag', 0)
+    n, m, times, machines = load_instance(os.path.join(DATA_DIR, 'la01.txt')).to_lists()
+    schedule = solve_job_scheduling(n, m, times, machines, time_limit=60)
+    print("Planned makespan {} ({:.2f}s)".format(schedule.makespan, schedule.runtime))
+
+    online = OnlineScheduler(schedule, time_limit=2.0)
+    events = [(100, MachineDown(2, 180)),
+              (200, NewJob(times[0], machines[0])),
+              (300, DurationChange(3, 4, 60))]
+    for now, event in events:
+        schedule = online.apply(now, event)
+        print("t={}: {} -> makespan {}, lower bound {}, {} in {:.2f}s".format(
+            now, type(event).__name__, schedule.makespan, schedule.bound, schedule.solver, schedule.runtime))
+        for message in schedule.violations():
+            print("Infeasible:", message)
@@ -0,0 +1,225 @@
+import numpy as np
+
+
+def machine_sequences(start, machines):
+    # Job order on every machine, read off the start times (start[j, k] by operation)
+    start = np.asarray(start)
+    machines = np.asarray(machines)
+    sequences = []
+    for i in range(machines.shape[1]):
+        jobs, ops = np.nonzero(machines == i)
+        order = np.lexsort((jobs, start[jobs, ops]))
+        sequences.append(jobs[order].tolist())
+    return sequences
+
+
+def semi_active_schedule(times, machines, sequences, lags=None, release=None):
+    """Earliest start times that respect the job routes and the machine sequences.
+
+    lags[j][k] is an extra delay between operations k and k+1 of job j,
+    rounded up because start times are integral; release[j][k], if given, is
+    the earliest start of every operation. Returns start[j, k] by
+    operation, or None when the sequences contain a cycle (no schedule can
+    follow them).
+    """
+    times = np.asarray(times, dtype=np.int64)
+    machines = np.asarray(machines, dtype=np.int64)
+    n, m = times.shape
+    op_of = np.empty((n, m), dtype=np.int64)  # op_of[j, machine] = operation index
+    op_of[np.arange(n)[:, None], machines] = np.arange(m)
+    op_of = op_of.tolist()
+
+    # Successor on the machine of every operation, and how many predecessors each has
+    machine_next = {}
+    indegree = np.zeros((n, m), dtype=np.int64)
+    indegree[:, 1:] = 1
+    for i, sequence in enumerate(sequences):
+        for a, b in zip(sequence, sequence[1:]):
+            machine_next[a, op_of[a][i]] = (b, op_of[b][i])
+            indegree[b, op_of[b][i]] += 1
+
+    lag = np.zeros((n, m), dtype=np.int64)
+    if lags is not None and m > 1:
+        lag[:, :-1] = np.ceil(np.asarray(lags, dtype=float).reshape(n, m - 1))
+
+    start = np.zeros((n, m), dtype=np.int64) if release is None else np.array(release, dtype=np.int64)
+    ready = [(j, 0) for j in range(n) if indegree[j, 0] == 0]
+    done = 0
+    while ready:
+        j, k = ready.pop()
+        done += 1
+        end = start[j, k] + times[j, k]
+        successors = []
+        if k + 1 < m:
+            successors.append((j, k + 1, end + lag[j, k]))
+        if (j, k) in machine_next:
+            successors.append(machine_next[j, k] + (end,))
+        for sj, sk, earliest in successors:
+            if earliest > start[sj, sk]:
+                start[sj, sk] = earliest
+            indegree[sj, sk] -= 1
+            if indegree[sj, sk] == 0:
+                ready.append((sj, sk))
+    if done < n * m:
+        return None
+    return start
+
+
+def makespan_of(start, times):
+    return (np.asarray(start) + np.asarray(times)).max()
+
+
+def _ceil_lags(lags, n, m):
+    lag = np.zeros((n, max(m - 1, 0)), dtype=np.int64)
+    if lags is not None and m > 1:
+        lag[:] = np.ceil(np.asarray(lags, dtype=float).reshape(n, m - 1))
+    return lag
+
+
+class Schedule:
+    """A solved job shop schedule: start[j, k] is the start of the k-th operation of job j.
+
+    Every solver returns one. bound is the best proven lower bound on the
+    makespan (None if the solver proves nothing), optimal says whether the
+    makespan is proven optimal, and model keeps the solver's model if it has
+    one. history lists (elapsed, makespan) for every improvement, for
+    solvers that keep one (tabu_search). np.asarray(schedule) gives the
+    start array, so a Schedule can be passed wherever a start array is
+    expected (e.g. as initial_start).
+    """
+
+    __slots__ = ('start', 'times', 'machines', 'lags', 'bound', 'optimal', 'solver', 'runtime', 'model', 'history')
+
+    def __init__(self, start, times, machines, lags=None, bound=None, optimal=False, solver=None, runtime=None,
+                 model=None, history=None):
+        self.start = np.asarray(start, dtype=np.int64)
+        self.times = np.asarray(times, dtype=np.int64)
+        self.machines = np.asarray(machines, dtype=np.int64)
+        if self.start.shape != self.times.shape or self.machines.shape != self.times.shape:
+            raise ValueError("start, times and machines must be (n, m) arrays of the same shape")
+        self.lags = lags
+        self.bound = bound
+        self.optimal = optimal
+        self.solver = solver
+        self.runtime = runtime
+        self.model = model
+        self.history = history
+
+    @classmethod
+    def from_model(cls, model, times, machines, lags=None, **fields):
+        # All start times in one getAttr call; model._x[j][i] is the start of job j on machine i
+        machines = np.asarray(machines, dtype=np.int64)
+        n, m = machines.shape
+        values = np.rint(model.getAttr('X', [var for row in model._x for var in row])).astype(np.int64)
+        start = values.reshape(n, m)[np.arange(n)[:, None], machines]
+        return cls(start, times, machines, lags, model=model, **fields)
+
+    def __array__(self, dtype=None, copy=None):
+        return self.start if dtype is None else self.start.astype(dtype)
+
+    @property
+    def n(self):
+        return self.start.shape[0]
+
+    @property
+    def m(self):
+        return self.start.shape[1]
+
+    @property
+    def end(self):
+        return self.start + self.times
+
+    @property
+    def makespan(self):
+        return int(self.end.max()) if self.start.size else 0
+
+    @property
+    def gap(self):
+        if self.bound is None:
+            return None
+        return (self.makespan - self.bound) / max(self.makespan, 1)
+
+    def by_machine(self):
+        # start[j, i] indexed by machine instead of operation, the layout of the MILP's x(j,i)
+        start = np.zeros_like(self.start)
+        start[np.arange(self.n)[:, None], self.machines] = self.start
+        return start
+
+    def sequences(self):
+        return machine_sequences(self.start, self.machines)
+
+    def violations(self):
+        """Messages for every broken constraint; empty for a feasible schedule."""
+        messages = []
+        start, end = self.start, self.end
+        for j, k in zip(*np.nonzero(start < 0)):
+            messages.append('job {} operation {} starts at {}'.format(j, k, start[j, k]))
+
+        # Each operation starts after the previous one of its job (plus the lag) has ended
+        ready = end[:, :-1] + _ceil_lags(self.lags, self.n, self.m)
+        for j, k in zip(*np.nonzero(start[:, 1:] < ready)):
+            messages.append('job {} operation {} starts at {} before {}'.format(j, k + 1, start[j, k + 1],
+                                                                                ready[j, k]))
+
+        # Sorted by machine and start, neighbours on the same machine must not overlap
+        flat_machine, flat_start, flat_end = self.machines.ravel(), start.ravel(), end.ravel()
+        order = np.lexsort((flat_start, flat_machine))
+        same = flat_machine[order[1:]] == flat_machine[order[:-1]]
+        overlap = same & (flat_start[order[1:]] < flat_end[order[:-1]])
+        for a, b in zip(order[:-1][overlap], order[1:][overlap]):
+            messages.append('machine {}: job {} operation {} overlaps job {} operation {}'.format(
+                flat_machine[a], a // self.m, a % self.m, b // self.m, b % self.m))
+        return messages
+
+    def is_feasible(self):
+        return not self.violations()
+
+    def left_shift(self):
+        # Same machine sequences with every operation as early as possible; solver
+        # schedules often leave idle time that the makespan does not need
+        start = semi_active_schedule(self.times, self.machines, self.sequences(), self.lags)
+        if start is None:
+            raise ValueError("The schedule orders some machines in a cycle")
+        return Schedule(start, self.times, self.machines, self.lags, self.bound, self.optimal, self.solver,
+                        self.runtime, self.model, self.history)
+
+    def critical_path(self):
+        """Operations (j, k) of a longest path of the machine sequences, in time order.
+
+        Taken from the left-shifted schedule, where every operation starts
+        exactly when its job or machine predecessor ends, so the path runs
+        from time 0 to that schedule's makespan.
+        """
+        shifted = self.left_shift()
+        start, end = shifted.start, shifted.end
+        ready = np.zeros_like(start)
+        ready[:, 1:] = end[:, :-1] + _ceil_lags(self.lags, self.n, self.m)
+
+        # Machine predecessor of every operation, from the operations sorted by machine and start
+        flat_machine = self.machines.ravel()
+        order = np.lexsort((start.ravel(), flat_machine))
+        machine_pred = np.full(start.size, -1)
+        same = flat_machine[order[1:]] == flat_machine[order[:-1]]
+        machine_pred[order[1:][same]] = order[:-1][same]
+
+        o = int(np.argmax(end))
+        path = [o]
+        while True:
+            j, k = divmod(o, self.m)
+            if k > 0 and ready[j, k] == start[j, k]:
+                o -= 1
+            elif machine_pred[o] >= 0 and end.flat[machine_pred[o]] == start[j, k]:
+                o = int(machine_pred[o])
+            else:
+                break
+            path.append(o)
+        return [divmod(o, self.m) for o in reversed(path)]
+
+    def utilization(self):
+        # Busy time of every machine divided by the makespan
+        busy = np.bincount(self.machines.ravel(), weights=self.times.ravel(), minlength=self.m)
+        return busy / max(self.makespan, 1)
+
+    def __repr__(self):
+        return 'Schedule(makespan={}, bound={}, optimal={}, solver={!r})'.format(
+            self.makespan, self.bound, self.optimal, self.solver)
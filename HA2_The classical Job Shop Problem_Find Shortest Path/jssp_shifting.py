@@ -0,0 +1,197 @@
+import heapq
+import time
+
+from jssp_bounds import jackson_preemptive, lower_bounds
+from jssp_cache import cached
+from jssp_schedule import Schedule
+from jssp_tabu import DisjunctiveGraph
+
+
+def schrage(release, processing, tails):
+    """Schrage's rule for 1|r_j, q_j|max(C_j + q_j): start the released job with the largest tail.
+
+    Returns (value, order) where order lists the job indices in sequence.
+    """
+    size = len(release)
+    by_release = sorted(range(size), key=lambda o: release[o])
+    heap = []
+    order = []
+    t = i = 0
+    value = 0
+    while len(order) < size:
+        if not heap:
+            t = max(t, release[by_release[i]])
+        while i < size and release[by_release[i]] <= t:
+            heapq.heappush(heap, (-tails[by_release[i]], by_release[i]))
+            i += 1
+        o = heapq.heappop(heap)[1]
+        order.append(o)
+        t += processing[o]
+        value = max(value, t + tails[o])
+    return value, order
+
+
+def _sequence_value(order, release, processing, tails):
+    t = value = 0
+    for o in order:
+        t = max(t, release[o]) + processing[o]
+        value = max(value, t + tails[o])
+    return value
+
+
+def carlier(release, processing, tails, node_limit=2000):
+    """Carlier's branch and bound for the one-machine problem with heads and tails.
+
+    Returns (value, order, exact); exact is False when node_limit ran out
+    before the search finished, in which case order is the best found.
+    """
+    release, tails = list(release), list(tails)
+    best = list(schrage(release, processing, tails))
+    nodes = [0]
+
+    def branch(depth):
+        nodes[0] += 1
+        if nodes[0] > node_limit or depth > 200:
+            nodes[0] = node_limit + 1
+            return
+        value, order = schrage(release, processing, tails)
+        if value < best[0]:
+            best[:] = [value, order]
+
+        # Critical block: b ends the path of length value, a starts it
+        starts = []
+        t = 0
+        for o in order:
+            t = max(t, release[o])
+            starts.append(t)
+            t += processing[o]
+        b = max(range(len(order)), key=lambda x: (starts[x] + processing[order[x]] + tails[order[x]], x))
+        a = b
+        while a > 0 and starts[a] == starts[a - 1] + processing[order[a - 1]]:
+            a -= 1
+        c = next((x for x in range(b - 1, a - 1, -1) if tails[order[x]] < tails[order[b]]), None)
+        if c is None:
+            return  # Schrage is optimal for this node
+        block = order[c + 1:b + 1]
+        r_block = min(release[o] for o in block)
+        q_block = min(tails[o] for o in block)
+        p_block = sum(processing[o] for o in block)
+        job = order[c]
+
+        # c goes after the block, or before it
+        for attribute, value_after in ((release, r_block + p_block), (tails, q_block + p_block)):
+            saved = attribute[job]
+            attribute[job] = max(saved, value_after)
+            bound = max(jackson_preemptive(release, processing, tails), r_block + p_block + q_block)
+            if bound < best[0]:
+                branch(depth + 1)
+            attribute[job] = saved
+
+    branch(0)
+    return best[0], best[1], nodes[0] <= node_limit
+
+
+def _machine_problem(graph, operations):
+    return ([graph.head[o] for o in operations], [graph.p[o] for o in operations],
+            [graph.tail[o] for o in operations])
+
+
+def _solve_machine(graph, operations, exact_limit, node_limit):
+    # Best sequence of one machine given the heads and tails of the current graph
+    release, processing, tails = _machine_problem(graph, operations)
+    if len(operations) <= exact_limit:
+        value, order, _ = carlier(release, processing, tails, node_limit)
+    else:
+        value, order = schrage(release, processing, tails)
+    return value, [operations[o] for o in order], (release, processing, tails)
+
+
+def _fix(graph, machine, sequence, fallback):
+    # Put a machine sequence into the graph; Carlier's modified heads can, rarely, order two
+    # operations against a path through other machines, so fall back to Schrage's sequence
+    for candidate in (sequence, fallback):
+        graph.sequences[machine] = candidate
+        graph._index_sequences()
+        if graph.evaluate():
+            return True
+    return False
+
+
+@cached('shifting_bottleneck')
+def shifting_bottleneck(n, m, times, machines, time_limit=60.0, exact_limit=40, node_limit=2000,
+                        reoptimize_cycles=2):
+    """Shifting bottleneck heuristic (Adams, Balas & Zawack).
+
+    Repeatedly solves the one-machine problem (heads and tails from the
+    machines fixed so far) of every open machine, fixes the one with the
+    largest value, and re-solves each fixed machine against the others for
+    up to reoptimize_cycles rounds. One-machine problems with at most
+    exact_limit operations go to Carlier's branch and bound (node_limit
+    nodes), larger ones use Schrage's rule. After time_limit seconds the
+    open machines are fixed with Schrage's rule straight away. Returns a
+    Schedule.
+    """
+    begin = time.perf_counter()
+    graph = DisjunctiveGraph(n, m, times, machines, [[] for _ in range(m)])
+    operations = [[] for _ in range(m)]
+    for j in range(n):
+        for k in range(m):
+            operations[machines[j][k]].append(j * m + k)
+
+    fixed = []
+    while len(fixed) < m:
+        out_of_time = time.perf_counter() - begin > time_limit
+        limit = -1 if out_of_time else exact_limit
+        best = None
+        for i in range(m):
+            if i in fixed:
+                continue
+            value, sequence, problem = _solve_machine(graph, operations[i], limit, node_limit)
+            if best is None or value > best[0]:
+                best = (value, i, sequence, problem)
+        _, bottleneck, sequence, problem = best
+        fallback = [operations[bottleneck][o] for o in schrage(*problem)[1]]
+        _fix(graph, bottleneck, sequence, fallback)
+        fixed.append(bottleneck)
+
+        # Re-optimize the machines fixed earlier, each against all the others
+        for _ in range(0 if out_of_time else reoptimize_cycles):
+            improved = False
+            for i in fixed[:-1]:
+                if time.perf_counter() - begin > time_limit:
+                    break
+                current = graph.sequences[i]
+                makespan = graph.makespan
+                graph.sequences[i] = []
+                graph._index_sequences()
+                graph.evaluate()
+                _, sequence, problem = _solve_machine(graph, operations[i], exact_limit, node_limit)
+                fallback = [operations[i][o] for o in schrage(*problem)[1]]
+                if not _fix(graph, i, sequence, fallback) or graph.makespan > makespan:
+                    _fix(graph, i, current, current)
+                elif graph.makespan < makespan:
+                    improved = True
+            if not improved:
+                break
+
+    bound = lower_bounds(times, machines)['best']
+    return Schedule(graph.start_times(), times, machines, bound=bound, optimal=graph.makespan <= bound,
+                    solver='shifting_bottleneck', runtime=time.perf_counter() - begin)
+
+
+if __name__ == "__main__":
+    import os
+
+    from jssp_benchmark import BEST_KNOWN, DATA_DIR
+    from jssp_instance import load_instance
+    from taillard_generator import generate_instance
+
+    for name in sorted(BEST_KNOWN):
+        n, m, times, machines = load_instance(os.path.join(DATA_DIR, name + '.txt')).to_lists()
+        schedule = shifting_bottleneck(n, m, times, machines)
+        print("{}: makespan {} (best known {}) in {:.2f}s".format(name, schedule.makespan, BEST_KNOWN[name],
+                                                                   schedule.runtime))
+    n, m, times, machines = generate_instance(50, 15, 1, 2, name='random 50x15').to_lists()
+    schedule = shifting_bottleneck(n, m, times, machines)
+    print("random 50x15: makespan {} (lower bound {}) in {:.2f}s".format(schedule.makespan, schedule.bound,
+                                                                         schedule.runtime))
@@ -0,0 +1,253 @@
+import random
+import time
+from collections import deque
+
+import numpy as np
+
+from jssp_cache import cached
+from jssp_heuristics import dispatch_best
+from jssp_schedule import Schedule, machine_sequences
+
+
+class DisjunctiveGraph:
+    """Operations o = j*m + k of a job shop with fixed machine sequences.
+
+    Keeps heads (longest path to the start of o) and tails (longest path
+    from the end of o to the sink) up to date for the tabu search.
+    """
+
+    def __init__(self, n, m, times, machines, sequences):
+        self.n, self.m = n, m
+        self.p = [int(t) for row in times for t in row]
+        self.machine = [int(i) for row in machines for i in row]
+        self.sequences = [[j * m + self._op(machines, j, i) for j in sequence]
+                          for i, sequence in enumerate(sequences)]
+        self._index_sequences()
+        self.evaluate()
+
+    @staticmethod
+    def _op(machines, j, i):
+        return list(machines[j]).index(i)
+
+    def _index_sequences(self):
+        size = self.n * self.m
+        self.mpred = [-1] * size
+        self.msucc = [-1] * size
+        for sequence in self.sequences:
+            for a, b in zip(sequence, sequence[1:]):
+                self.msucc[a] = b
+                self.mpred[b] = a
+
+    def jpred(self, o):
+        return o - 1 if o % self.m else -1
+
+    def jsucc(self, o):
+        return o + 1 if (o + 1) % self.m else -1
+
+    def evaluate(self):
+        # Heads in topological order, then tails in reverse; returns False on a cycle
+        size = self.n * self.m
+        p, mpred, msucc = self.p, self.mpred, self.msucc
+        indegree = [(o % self.m > 0) + (mpred[o] >= 0) for o in range(size)]
+        ready = [o for o in range(size) if indegree[o] == 0]
+        order = []
+        head = [0] * size
+        while ready:
+            o = ready.pop()
+            order.append(o)
+            end = head[o] + p[o]
+            for s in (self.jsucc(o), msucc[o]):
+                if s >= 0:
+                    if end > head[s]:
+                        head[s] = end
+                    indegree[s] -= 1
+                    if indegree[s] == 0:
+                        ready.append(s)
+        if len(order) < size:
+            return False
+        tail = [0] * size
+        for o in reversed(order):
+            best = 0
+            for s in (self.jsucc(o), msucc[o]):
+                if s >= 0 and tail[s] + p[s] > best:
+                    best = tail[s] + p[s]
+            tail[o] = best
+        self.head, self.tail = head, tail
+        self.makespan = max(head[o] + p[o] for o in range(size))
+        return True
+
+    def critical_blocks(self):
+        # Walk one critical path backwards from the sink and cut it into machine blocks
+        p, head, tail = self.p, self.head, self.tail
+        o = next(o for o in range(len(p)) if head[o] + p[o] == self.makespan and tail[o] == 0)
+        path = [o]
+        while head[o] > 0:
+            a = self.mpred[o]
+            if a >= 0 and head[a] + p[a] == head[o]:
+                o = a
+            else:
+                o = self.jpred(o)
+            path.append(o)
+        path.reverse()
+
+        blocks = [[path[0]]]
+        for a, b in zip(path, path[1:]):
+            if self.msucc[a] == b:
+                blocks[-1].append(b)
+            else:
+                blocks.append([b])
+        return blocks
+
+    def n5_moves(self):
+        # Swap the first two / last two operations of the critical blocks, except at the
+        # start of the first block and the end of the last one (Nowicki & Smutnicki)
+        blocks = self.critical_blocks()
+        moves = []
+        for index, block in enumerate(blocks):
+            if len(block) < 2:
+                continue
+            if index > 0:
+                moves.append((block[0], block[1]))
+            if index < len(blocks) - 1 and (index == 0 or len(block) > 2):
+                moves.append((block[-2], block[-1]))
+        return moves
+
+    def estimate(self, u, v):
+        # Makespan of the longest path through u and v after swapping them (v before u)
+        p, head, tail, mpred, msucc = self.p, self.head, self.tail, self.mpred, self.msucc
+        ju, jv = self.jpred(u), self.jpred(v)
+        a, b = mpred[u], msucc[v]
+        head_v = max(head[jv] + p[jv] if jv >= 0 else 0, head[a] + p[a] if a >= 0 else 0)
+        head_u = max(head[ju] + p[ju] if ju >= 0 else 0, head_v + p[v])
+        su, sv = self.jsucc(u), self.jsucc(v)
+        tail_u = max(tail[su] + p[su] if su >= 0 else 0, tail[b] + p[b] if b >= 0 else 0)
+        tail_v = max(tail[sv] + p[sv] if sv >= 0 else 0, tail_u + p[u])
+        return max(head_v + p[v] + tail_v, head_u + p[u] + tail_u)
+
+    def swap(self, u, v):
+        # u directly precedes v on their machine; afterwards v precedes u
+        sequence = self.sequences[self.machine[u]]
+        position = sequence.index(u)
+        sequence[position], sequence[position + 1] = v, u
+        a, b = self.mpred[u], self.msucc[v]
+        if a >= 0:
+            self.msucc[a] = v
+        if b >= 0:
+            self.mpred[b] = u
+        self.mpred[v], self.msucc[v] = a, u
+        self.mpred[u], self.msucc[u] = v, b
+
+    def job_sequences(self):
+        # Machine sequences as job numbers, the format machine_sequences produces
+        return [[o // self.m for o in sequence] for sequence in self.sequences]
+
+    def start_times(self):
+        return np.array(self.head, dtype=np.int64).reshape(self.n, self.m)
+
+
+@cached('tabu')
+def tabu_search(n, m, times, machines, time_limit=10.0, max_iterations=None, initial_start=None,
+                tenure=None, max_stagnation=2000, seed=0, on_improvement=None, lower_bound=None):
+    """Tabu search over N5 critical-block swaps.
+
+    Starts from initial_start (start[j][k] by operation) or the best
+    dispatching-rule schedule and runs until time_limit seconds or
+    max_iterations, or until the makespan reaches lower_bound (e.g. from
+    jssp_bounds.lower_bounds). Every new best schedule is passed to
+    on_improvement(elapsed, makespan, start) and appended to
+    schedule.history as (elapsed, makespan). Returns a Schedule, which
+    counts as optimal when it reaches lower_bound or has no N5 move left.
+    """
+    begin = time.perf_counter()
+    rng = random.Random(seed)
+    if initial_start is None:
+        initial_start = dispatch_best(times, machines).start
+    graph = DisjunctiveGraph(n, m, times, machines, machine_sequences(initial_start, machines))
+    if tenure is None:
+        tenure = 10 + n // m
+
+    best_makespan = graph.makespan
+    best_sequences = [list(s) for s in graph.sequences]
+    history = [(time.perf_counter() - begin, best_makespan)]
+    if on_improvement is not None:
+        on_improvement(history[-1][0], best_makespan, graph.start_times())
+
+    tabu = deque()
+    tabu_set = set()
+    iteration = stagnation = 0
+    proven = False
+    while time.perf_counter() - begin < time_limit and (max_iterations is None or iteration < max_iterations):
+        if lower_bound is not None and best_makespan <= lower_bound:
+            break
+        iteration += 1
+        moves = graph.n5_moves()
+        if not moves:
+            proven = True
+            break  # the critical path is one job or one machine's work, so this is optimal
+
+        # Best non-tabu move; tabu moves only if they beat the best makespan (aspiration)
+        chosen = None
+        chosen_value = None
+        for u, v in moves:
+            value = graph.estimate(u, v)
+            if (u, v) in tabu_set and value >= best_makespan:
+                continue
+            if chosen is None or value < chosen_value or (value == chosen_value and rng.random() < 0.5):
+                chosen, chosen_value = (u, v), value
+        if chosen is None:
+            chosen = rng.choice(moves)
+
+        u, v = chosen
+        graph.swap(u, v)
+        graph.evaluate()
+        # Forbid putting u back in front of v for a while
+        tabu.append((v, u))
+        tabu_set.add((v, u))
+        if len(tabu) > tenure:
+            tabu_set.discard(tabu.popleft())
+
+        if graph.makespan < best_makespan:
+            best_makespan = graph.makespan
+            best_sequences = [list(s) for s in graph.sequences]
+            stagnation = 0
+            history.append((time.perf_counter() - begin, best_makespan))
+            if on_improvement is not None:
+                on_improvement(history[-1][0], best_makespan, graph.start_times())
+        else:
+            stagnation += 1
+            if stagnation >= max_stagnation:
+                # Restart from the best schedule with a few random critical swaps
+                graph.sequences = [list(s) for s in best_sequences]
+                graph._index_sequences()
+                graph.evaluate()
+                for _ in range(3):
+                    moves = graph.n5_moves()
+                    if moves:
+                        graph.swap(*rng.choice(moves))
+                        graph.evaluate()
+                tabu.clear()
+                tabu_set.clear()
+                stagnation = 0
+
+    graph.sequences = best_sequences
+    graph._index_sequences()
+    graph.evaluate()
+    optimal = proven or (lower_bound is not None and best_makespan <= lower_bound)
+    schedule = Schedule(graph.start_times(), times, machines, bound=lower_bound, optimal=optimal, solver='tabu',
+                        runtime=time.perf_counter() - begin, history=history)
+    return schedule
+
+
+if __name__ == "__main__":
+    import os
+
+    from jssp_benchmark import BEST_KNOWN, DATA_DIR
+    from jssp_bounds import lower_bounds
+    from jssp_instance import load_instance
+
+    for name in sorted(BEST_KNOWN):
+        n, m, times, machines = load_instance(os.path.join(DATA_DIR, name + '.txt')).to_lists()
+        schedule = tabu_search(n, m, times, machines, time_limit=10.0,
+                               lower_bound=lower_bounds(times, machines)['best'])
+        print("{}: makespan {} (best known {}), last improvement after {:.2f}s".format(
+            name, schedule.makespan, BEST_KNOWN[name], schedule.history[-1][0]))
@@ -0,0 +1,94 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from jssp_instance import DEFAULT_CACHE_DIR
+
+# Speed of the transporters on the shop floor (distance units per time unit), as in task2
+DEFAULT_SPEED = 5.0
+
+# Matrices are kept per process as well, so repeated solves never touch the disk again
+_matrix_memo = {}
+
+
+def layout_digest(graph, machine_node, speed=DEFAULT_SPEED):
+    """Hash of everything the travel times depend on: nodes, edges, machine locations and speed."""
+    layout = {
+        'nodes': sorted([node.name, [float(c) for c in node.coordinates]] for node in graph.nodes),
+        'edges': sorted([edge.start.name, edge.end.name, float(edge.weight)] for edge in graph.edges),
+        'machines': sorted([str(key), node.name] for key, node in machine_node.items()),
+        'speed': float(speed),
+    }
+    return hashlib.sha1(json.dumps(layout, sort_keys=True).encode()).hexdigest()
+
+
+def _shortest_distances(graph, locations):
+    # A* between every pair of locations; the floor is undirected, so each pair is searched once
+    size = len(locations)
+    distance = np.zeros((size, size))
+    for a in range(size):
+        for b in range(a + 1, size):
+            dist, path = graph.astar(locations[a], locations[b])
+            if dist is None:
+                raise ValueError("No path between {} and {} on the shop floor".format(locations[a].name,
+                                                                                  locations[b].name))
+            distance[a, b] = distance[b, a] = dist
+    return distance
+
+
+def travel_time_matrix(graph=None, machine_node=None, speed=DEFAULT_SPEED, cache_dir=DEFAULT_CACHE_DIR):
+    """Travel time T[a, b] from machine a to machine b over the shop floor.
+
+    graph and machine_node default to floor_layout's shop_floor and
+    machine_node; only the integer (machine) keys of machine_node are used,
+    in increasing order. The matrix is cached as travel-<layout digest>.npy
+    in cache_dir, so a layout or speed change computes a new one and
+    anything else reuses it; pass cache_dir=None to always compute.
+    """
+    if graph is None or machine_node is None:
+        import floor_layout
+        graph = floor_layout.shop_floor if graph is None else graph
+        machine_node = floor_layout.machine_node if machine_node is None else machine_node
+
+    key = layout_digest(graph, machine_node, speed)
+    if key in _matrix_memo:
+        return _matrix_memo[key]
+    path = os.path.join(cache_dir, 'travel-{}.npy'.format(key)) if cache_dir is not None else None
+    if path is not None and os.path.exists(path):
+        try:
+            matrix = np.load(path)
+        except (OSError, ValueError):
+            matrix = None
+        if matrix is not None:
+            _matrix_memo[key] = matrix
+            return matrix
+
+    machines = sorted(k for k in machine_node if isinstance(k, int))
+    matrix = _shortest_distances(graph, [machine_node[k] for k in machines]) / speed
+    if path is not None:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            # Write to a temporary file first so concurrent readers never see half a file
+            tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+            with open(tmp_path, 'wb') as file:
+                np.save(file, matrix)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass  # a read-only cache folder should not stop us from solving
+    _matrix_memo[key] = matrix
+    return matrix
+
+
+def travel_lags(machines, travel_times):
+    # lags[j][k]: travel from the machine of operation k of job j to that of operation k+1
+    machines = np.asarray(machines)
+    travel_times = np.asarray(travel_times)
+    return travel_times[machines[:, :-1], machines[:, 1:]].tolist()
+
+
+if __name__ == "__main__":
+    matrix = travel_time_matrix()
+    print("Travel times between machines at speed {}:".format(DEFAULT_SPEED))
+    print(np.array2string(matrix, precision=1))
@@ -0,0 +1,158 @@
+import time
+
+import numpy as np
+import z3
+
+from jssp_bounds import lower_bounds
+from jssp_cache import cached
+from jssp_heuristics import dispatch_best
+from jssp_schedule import Schedule, makespan_of
+
+STRATEGIES = ('bisection', 'linear')
+
+
+class JobShopZ3:
+    """A job shop encoded once in a single incremental z3 Solver.
+
+    start[j][k] is the start of the k-th operation of job j and before[a, b]
+    (a < b, operations o = j*m + k on the same machine) is true when a runs
+    first. A makespan bound T is never added as a constraint: bound(T)
+    returns an assumption literal that implies makespan <= T, so one solver
+    (and the clauses it learned) serves every probe.
+    """
+
+    def __init__(self, n, m, times, machines, horizon=None):
+        self.n, self.m = n, m
+        self.times = [[int(t) for t in row] for row in times]
+        self.solver = z3.Solver()
+        self.start = [[z3.Int('start_{}_{}'.format(j, k)) for k in range(m)] for j in range(n)]
+        self.makespan = z3.Int('makespan')
+        self._bounds = {}
+        p, s, solver = self.times, self.start, self.solver
+
+        for j in range(n):
+            solver.add(s[j][0] >= 0)
+            for k in range(m - 1):
+                solver.add(s[j][k] + p[j][k] <= s[j][k + 1])
+            solver.add(s[j][m - 1] + p[j][m - 1] <= self.makespan)
+        if horizon is not None:
+            solver.add(self.makespan <= int(horizon))
+
+        operations = [[] for _ in range(m)]
+        for j in range(n):
+            for k in range(m):
+                operations[machines[j][k]].append((j, k))
+        self.before = {}
+        for ops in operations:
+            for x, (ja, ka) in enumerate(ops):
+                for jb, kb in ops[x + 1:]:
+                    order = z3.Bool('before_{}_{}'.format(ja * m + ka, jb * m + kb))
+                    self.before[ja * m + ka, jb * m + kb] = order
+                    solver.add(z3.Implies(order, s[ja][ka] + p[ja][ka] <= s[jb][kb]),
+                               z3.Implies(z3.Not(order), s[jb][kb] + p[jb][kb] <= s[ja][ka]))
+
+    def bound(self, makespan):
+        # Assumption literal for "makespan <= bound", added to the solver the first time it is asked for
+        literal = self._bounds.get(makespan)
+        if literal is None:
+            literal = z3.Bool('makespan_le_{}'.format(makespan))
+            self.solver.add(z3.Implies(literal, self.makespan <= makespan))
+            self._bounds[makespan] = literal
+        return literal
+
+    def hint(self, start):
+        # Start the search from a known schedule: phase hints for the order literals (z3 >= 4.13)
+        if not hasattr(self.solver, 'set_initial_value'):
+            return
+        m = self.m
+        for (a, b), order in self.before.items():
+            self.solver.set_initial_value(order, bool(start[a // m][a % m] <= start[b // m][b % m]))
+
+    def check(self, makespan, timeout=None):
+        """Probe one bound: z3.sat, z3.unsat or z3.unknown (timeout in seconds)."""
+        if timeout is not None:
+            self.solver.set('timeout', max(1, int(timeout * 1000)))
+        return self.solver.check(self.bound(makespan))
+
+    def start_times(self):
+        model = self.solver.model()
+        return [[model.eval(self.start[j][k], model_completion=True).as_long() for k in range(self.m)]
+                for j in range(self.n)]
+
+
+@cached('z3')
+def solve_job_scheduling_z3(n, m, times, machines, time_limit=20 * 60, callback=None, initial_start=None,
+                            strategy='bisection', on_bound=None, poll=None):
+    """Minimize the makespan by probing bounds on one incremental z3 solver.
+
+    strategy='bisection' probes the middle of [lower bound, best - 1],
+    'linear' always probes best - 1. A satisfiable probe gives a schedule
+    (callback(elapsed, makespan, start) for every improvement), an
+    unsatisfiable one proves bound + 1 as a lower bound and is reported
+    through on_bound(elapsed, lower). The search starts from initial_start
+    or the best dispatching-rule schedule, with its machine orders as phase
+    hints; a probe that times out ends it. poll() is called before every
+    probe and returns (makespan, start, lower) found elsewhere (see
+    jssp_portfolio), which narrow the interval the same way.
+
+    Returns a Schedule (optimal when the bounds met, bound = the best proven
+    lower bound, model = the JobShopZ3 with the number of probes in
+    .probes).
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError("strategy must be one of {}, got {!r}".format(STRATEGIES, strategy))
+    begin = time.perf_counter()
+    lower = lower_bounds(times, machines)['best']
+    if initial_start is None:
+        initial_start = dispatch_best(times, machines).start
+    best = np.asarray(initial_start, dtype=np.int64).tolist()
+    best_makespan = int(makespan_of(best, times))
+    if callback is not None:
+        callback(time.perf_counter() - begin, best_makespan, best)
+
+    shop = JobShopZ3(n, m, times, machines, horizon=best_makespan)
+    shop.hint(best)
+    shop.probes = 0
+    while lower < best_makespan:
+        remaining = time_limit - (time.perf_counter() - begin)
+        if remaining <= 0:
+            break
+        if poll is not None:
+            makespan, start, proven = poll()
+            lower = max(lower, proven)
+            if makespan is not None and makespan < best_makespan:
+                best, best_makespan = start, makespan
+            if lower >= best_makespan:
+                break
+        probe = (lower + best_makespan - 1) // 2 if strategy == 'bisection' else best_makespan - 1
+        result = shop.check(probe, timeout=remaining)
+        shop.probes += 1
+        if result == z3.sat:
+            best = shop.start_times()
+            best_makespan = int(makespan_of(best, times))
+            if callback is not None:
+                callback(time.perf_counter() - begin, best_makespan, best)
+        elif result == z3.unsat:
+            lower = probe + 1
+            if on_bound is not None:
+                on_bound(time.perf_counter() - begin, lower)
+        else:
+            break  # out of time
+
+    return Schedule(best, times, machines, bound=lower, optimal=lower >= best_makespan, solver='z3',
+                    runtime=time.perf_counter() - begin, model=shop)
+
+
+if __name__ == "__main__":
+    import os
+
+    from jssp_benchmark import BEST_KNOWN, DATA_DIR
+    from jssp_instance import load_instance
+
+    for name in ('ft06', 'la01', 'la05'):
+        n, m, times, machines = load_instance(os.path.join(DATA_DIR, name + '.txt')).to_lists()
+        schedule = solve_job_scheduling_z3(n, m, times, machines, time_limit=120,
+                                           on_bound=lambda elapsed, lower: print("  {:.2f}s: makespan >= {}".format(
+                                               elapsed, lower)))
+        print("{}: makespan {} (best known {}), lower bound {}, {} probes in {:.2f}s".format(
+            name, schedule.makespan, BEST_KNOWN[name], schedule.bound, schedule.model.probes, schedule.runtime))
@@ -1,31 +1,10 @@
-def read_job_scheduling_data(file_path):
-    try:
-        with open(file_path, 'r') as file:
-            lines = file.readlines()
-            # Extract n and m values from the first line
-            if not lines:
-                raise ValueError("File is empty")
-            try:
-                n, m = map(int, lines[0].split())
-            except ValueError:
-                raise ValueError("First line should contain two integers representing n and m")
-            # Extract n and m values from the first line
-            # n, m = map(int, lines[0].split())
-
-            # Initialize lists for times and machines
-            times = []
-            machines = []
+from jssp_instance import load_instance
 
-            # Read the remaining lines and extract times and machines data
-            for line in lines[1:]:
-                data = list(map(int, line.split()))
-                if len(data) % 2 != 0:
-                    raise ValueError("Each job line must have an even number of integers")
-                machine_process_pairs = [(data[i], data[i + 1]) for i in range(0, len(data), 2)]
-                machines.append([pair[0] for pair in machine_process_pairs])
-                times.append([pair[1] for pair in machine_process_pairs])
 
-            return n, m, times, machines
+def read_job_scheduling_data(file_path):
+    try:
+        # Parsing and the on-disk cache live in jssp_instance.load_instance
+        return load_instance(file_path).to_lists()
     except FileNotFoundError:
         print(f"Error: The file {file_path} was not found.")
         return None
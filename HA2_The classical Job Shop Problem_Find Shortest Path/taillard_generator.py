@@ -0,0 +1,178 @@
+import argparse
+import os
+
+import numpy as np
+
+from jssp_instance import JobShopInstance, write_job_scheduling_data
+
+# Instance sizes (jobs, machines) of the Taillard job shop families
+TAILLARD_SIZES = [
+    (range(1, 11), (15, 15)),
+    (range(11, 21), (20, 15)),
+    (range(21, 31), (20, 20)),
+    (range(31, 41), (30, 15)),
+    (range(41, 51), (30, 20)),
+    (range(51, 61), (50, 15)),
+    (range(61, 71), (50, 20)),
+    (range(71, 81), (100, 20)),
+]
+
+# (time seed, machine seed) from Taillard (1993), "Benchmarks for basic scheduling problems".
+TAILLARD_SEEDS = {
+    1: (840612802, 398197754),
+    2: (1314640371, 386720536),
+    3: (1227221349, 316176388),
+    4: (342269428, 1806358582),
+    5: (1603221416, 1501949241),
+    6: (1357584978, 1734077082),
+    7: (44531661, 1374316395),
+    8: (302545136, 2092186050),
+    9: (1153780144, 1393392374),
+    10: (73896786, 1544979948),
+    11: (533484900, 317419073),
+    12: (1894307698, 1474268163),
+    13: (874340513, 509669280),
+    14: (1124986343, 1209573668),
+    15: (1463788335, 529048107),
+    16: (1056908795, 25321885),
+    17: (195672285, 1717580117),
+    18: (961965583, 1353003786),
+    19: (1610169733, 1734469503),
+    20: (532794656, 998486810),
+    21: (1035939303, 773961798),
+    22: (5997802, 1872541150),
+    23: (1357503601, 722225039),
+    24: (806159563, 1166962073),
+    25: (1902815253, 1879990068),
+    26: (1503184031, 1850351876),
+    27: (1032645967, 99711329),
+    28: (229894219, 1158117804),
+    29: (823349822, 108033225),
+    30: (1297900341, 489486403),
+    31: (98640593, 1981283465),
+    32: (1839268120, 248890888),
+    33: (573875290, 2081512253),
+    34: (1670898570, 788294565),
+    35: (1118914567, 1074349202),
+    36: (178750207, 294279708),
+    37: (1549372605, 596993084),
+    38: (798174738, 151685779),
+    39: (553410952, 1329272528),
+    40: (1661531649, 1173386294),
+    41: (1841414609, 1357882888),
+    42: (2116959593, 1546338557),
+    43: (796392706, 1230864158),
+    44: (532496463, 254174057),
+    45: (2020525633, 978943053),
+    46: (524444252, 185526083),
+    47: (1569394691, 487269855),
+    48: (1460267840, 1631446539),
+    49: (198324822, 1937476577),
+    50: (38071822, 1541985579),
+    51: (17271, 718939),
+    52: (660481279, 449650254),
+    53: (352229765, 949737911),
+    54: (1197518780, 166840558),
+    55: (1376020303, 483922052),
+    56: (2106639239, 955932362),
+    57: (1765352082, 1209982549),
+    58: (1105092880, 1349003108),
+    59: (907248070, 919544535),
+    60: (2011630757, 1845447001),
+    61: (8493988, 2738939),
+    62: (1991925010, 709517751),
+    63: (342093237, 786960785),
+    64: (1634043183, 973178279),
+    65: (341706507, 286513148),
+    66: (320167954, 1411193018),
+    67: (1089696753, 298068750),
+    68: (433032965, 1589656152),
+    69: (615974477, 331205412),
+    70: (236150141, 592292984),
+    71: (302034063, 1203569070),
+    72: (1437643198, 1692025209),
+    73: (1792475497, 1039908559),
+    74: (1647273132, 1012841433),
+    75: (696480901, 1689682358),
+    76: (1785569423, 1092647459),
+    77: (117806902, 739059626),
+    78: (1639154709, 1319962509),
+    79: (2007423389, 749368241),
+    80: (682761130, 262763021),
+}
+
+
+def taillard_unif(seed, low, high):
+    # Taillard's portable LCG (Park-Miller, Schrage's method); returns (new seed, value)
+    m, a, b, c = 2147483647, 16807, 127773, 2836
+    k = seed // b
+    seed = a * (seed % b) - k * c
+    if seed < 0:
+        seed += m
+    return seed, low + int(seed / m * (high - low + 1))
+
+
+def generate_instance(n, m, time_seed, machine_seed, name=None, low=1, high=99):
+    """Generate an n x m job shop instance with Taillard's procedure.
+
+    Processing times are drawn uniformly from [low, high]; every job visits all
+    machines in a random order obtained by swapping with U[k, m].
+    """
+    times = np.empty((n, m), dtype=np.int32)
+    seed = time_seed
+    for j in range(n):
+        for k in range(m):
+            seed, times[j, k] = taillard_unif(seed, low, high)
+
+    machines = np.tile(np.arange(m, dtype=np.int32), (n, 1))
+    seed = machine_seed
+    for j in range(n):
+        for k in range(m):
+            seed, u = taillard_unif(seed, k + 1, m)
+            machines[j, k], machines[j, u - 1] = machines[j, u - 1], machines[j, k]
+
+    metadata = {'time_seed': time_seed, 'machine_seed': machine_seed}
+    return JobShopInstance(machines, times, name=name or 'rnd_{}x{}_{}_{}'.format(n, m, time_seed, machine_seed),
+                           metadata=metadata)
+
+
+def taillard_size(number):
+    for numbers, size in TAILLARD_SIZES:
+        if number in numbers:
+            return size
+    raise ValueError("Taillard job shop instances are numbered 1 to 80, got {}".format(number))
+
+
+def taillard_instance(number, time_seed=None, machine_seed=None):
+    # Rebuild ta<number> from its published seeds
+    n, m = taillard_size(number)
+    if time_seed is None or machine_seed is None:
+        time_seed, machine_seed = TAILLARD_SEEDS[number]
+    return generate_instance(n, m, time_seed, machine_seed, name='ta{:02d}'.format(number))
+
+
+def random_instances(n, m, count, seed=1):
+    # Reproducible stream of arbitrary n x m instances, seeds drawn from the same LCG
+    for _ in range(count):
+        seed, time_seed = taillard_unif(seed, 1, 2147483646)
+        seed, machine_seed = taillard_unif(seed, 1, 2147483646)
+        yield generate_instance(n, m, time_seed, machine_seed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Write Taillard or random job shop instances')
+    parser.add_argument('--taillard', nargs='*', type=int, default=[], help='Taillard numbers, e.g. 1 2 10')
+    parser.add_argument('--size', nargs=2, type=int, metavar=('N', 'M'), help='random instances of this size')
+    parser.add_argument('--count', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--out', default='.', help='output folder')
+    args = parser.parse_args()
+
+    instances = [taillard_instance(k) for k in args.taillard]
+    if args.size:
+        instances.extend(random_instances(args.size[0], args.size[1], args.count, args.seed))
+    os.makedirs(args.out, exist_ok=True)
+    for instance in instances:
+        file_path = os.path.join(args.out, instance.name + '.txt')
+        write_job_scheduling_data(instance, file_path)
+        print("{} ({}x{}) -> {}".format(instance.name, instance.n, instance.m, file_path))
@@ -152,43 +152,6 @@ edge_list = [edge for _, edge in edges.items()]
 shop_floor = Graph(node_list, edge_list)
 
 
-def read_job_scheduling_data(file_path):
-    try:
-        with open(file_path, 'r') as file:
-            lines = file.readlines()
-            # Extract n and m values from the first line
-            if not lines:
-                raise ValueError("File is empty")
-            try:
-                n, m = map(int, lines[0].split())
-            except ValueError:
-                raise ValueError("First line should contain two integers representing n and m")
-            # Extract n and m values from the first line
-            # n, m = map(int, lines[0].split())
-
-            # Initialize lists for times and machines
-            times = []
-            machines = []
-
-            # Read the remaining lines and extract times and machines data
-            for line in lines[1:]:
-                data = list(map(int, line.split()))
-                if len(data) % 2 != 0:
-                    raise ValueError("Each job line must have an even number of integers")
-                machine_process_pairs = [(data[i], data[i + 1]) for i in range(0, len(data), 2)]
-                machines.append([pair[0] for pair in machine_process_pairs])
-                times.append([pair[1] for pair in machine_process_pairs])
-
-            return n, m, times, machines
-    except FileNotFoundError:
-        print(f"Error: The file {file_path} was not found.")
-        return None
-    except ValueError as ve:
-        print(f"Error: {ve}")
-        return None
-
-
-
 # print(shop_floor)
 def task2():
     speed = 5.0                   
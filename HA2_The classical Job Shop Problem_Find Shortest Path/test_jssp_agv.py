@@ -0,0 +1,24 @@
+import pytest
+
+gp = pytest.importorskip('gurobipy')
+
+from jssp_agv import solve_job_scheduling_agv
+
+
+def test_benders_cuts_raise_the_bound():
+    # With a single vehicle the travel decides the makespan; 32 is optimal (checked over all sequences)
+    times = [[3, 2, 2], [2, 3, 1], [2, 2, 3]]
+    machines = [[0, 1, 2], [1, 2, 0], [2, 0, 1]]
+    travel = [[0, 4, 6], [4, 0, 3], [6, 3, 0]]
+    bounds = []
+    gp.setParam('OutputFlag', 0)
+    schedule = solve_job_scheduling_agv(3, 3, times, machines, vehicles=1, travel_times=travel, time_limit=60,
+                                        on_bound=lambda elapsed, lower: bounds.append(lower))
+    gp.resetParams()
+    plan = schedule.model
+    assert plan.cuts > 1
+    assert bounds == sorted(bounds) and len(bounds) > 1
+    assert schedule.makespan == schedule.bound == 32
+    assert schedule.optimal
+    assert schedule.violations() == []
+    assert plan.violations(schedule.start, times) == []
@@ -0,0 +1,17 @@
+import pytest
+
+gp = pytest.importorskip('gurobipy')
+
+from jssp_milp import solve_job_scheduling
+
+
+def test_stop_at_lower_bound_before_root_bound():
+    # The dispatching horizon already meets the lower bound, so the callback stops Gurobi
+    # before it has a bound of its own (ObjBound is -inf)
+    gp.setParam('OutputFlag', 0)
+    schedule = solve_job_scheduling(2, 2, [[3, 2], [4, 1]], [[0, 1], [1, 0]], time_limit=10)
+    gp.resetParams()
+    assert schedule.makespan == 6
+    assert schedule.bound == 6
+    assert schedule.optimal
+    assert schedule.violations() == []